@@ -0,0 +1,152 @@
+"""Usage analytics.
+
+Handlers append (user, action, time) events to a buffer that is written to
+usage_events in batches. A background rollup folds the raw events into
+hourly and daily per-action counts plus daily/weekly active users, then
+deletes them, so usage_events only ever holds the last few minutes and the
+admin report reads nothing but the (per-day sized) rollup tables.
+
+Actions are "command:<name>", "callback:<route>" or "message". Days are UTC.
+"""
+import asyncio
+import logging
+import time
+
+FLUSH_INTERVAL = 5.0
+ROLLUP_INTERVAL = 300.0
+MAX_PENDING = 1000
+# How long the finer-grained tables are kept
+HOURLY_RETENTION_DAYS = 14
+ACTIVE_USERS_RETENTION_DAYS = 60
+
+logger = logging.getLogger(__name__)
+
+
+def rollup(conn):
+    """Fold every raw event into the rollup tables and delete it (one write
+    transaction). Returns the number of events rolled up."""
+    last_id = conn.execute("SELECT MAX(id) FROM usage_events").fetchone()[0]
+    if last_id is None:
+        return 0
+    days = [day for (day,) in conn.execute(
+        "SELECT DISTINCT date(ts, 'unixepoch') FROM usage_events WHERE id <= ?", (last_id,)
+    )]
+    conn.execute('''
+        INSERT INTO usage_hourly (hour, action, events)
+        SELECT ts / 3600 * 3600, action, COUNT(*) FROM usage_events WHERE id <= ? GROUP BY 1, 2
+        ON CONFLICT(hour, action) DO UPDATE SET events = events + excluded.events
+    ''', (last_id,))
+    conn.execute('''
+        INSERT INTO usage_daily (day, action, events)
+        SELECT date(ts, 'unixepoch'), action, COUNT(*) FROM usage_events WHERE id <= ? GROUP BY 1, 2
+        ON CONFLICT(day, action) DO UPDATE SET events = events + excluded.events
+    ''', (last_id,))
+    conn.execute('''
+        INSERT OR IGNORE INTO usage_active_users (day, user_id)
+        SELECT DISTINCT date(ts, 'unixepoch'), user_id FROM usage_events WHERE id <= ?
+    ''', (last_id,))
+    count = conn.execute("DELETE FROM usage_events WHERE id <= ?", (last_id,)).rowcount
+
+    # Only the days that received events need their DAU/WAU recomputed
+    for day in days:
+        conn.execute('''
+            INSERT INTO usage_active (day, dau, wau) VALUES (
+                ?1,
+                (SELECT COUNT(*) FROM usage_active_users WHERE day = ?1),
+                (SELECT COUNT(DISTINCT user_id) FROM usage_active_users WHERE day BETWEEN date(?1, '-6 days') AND ?1)
+            )
+            ON CONFLICT(day) DO UPDATE SET dau = excluded.dau, wau = excluded.wau
+        ''', (day,))
+
+    conn.execute("DELETE FROM usage_hourly WHERE hour < ?",
+                 (int(time.time()) - HOURLY_RETENTION_DAYS * 86400,))
+    conn.execute("DELETE FROM usage_active_users WHERE day < date('now', ?)",
+                 (f'-{ACTIVE_USERS_RETENTION_DAYS} days',))
+    return count
+
+
+def report(conn, days=7, top=5):
+    """Summary for the admin screen, read from the rollup tables only"""
+    since = f'-{days - 1} days'
+    active = conn.execute(
+        "SELECT day, dau, wau FROM usage_active WHERE day >= date('now', ?) ORDER BY day DESC", (since,)
+    ).fetchall()
+
+    def top_actions(kind):
+        return conn.execute(
+            "SELECT substr(action, ?), SUM(events) FROM usage_daily "
+            "WHERE day >= date('now', ?) AND action LIKE ? GROUP BY action ORDER BY 2 DESC LIMIT ?",
+            (len(kind) + 2, since, f'{kind}:%', top)
+        ).fetchall()
+
+    events_24h = conn.execute(
+        "SELECT COALESCE(SUM(events), 0) FROM usage_hourly WHERE hour >= ?", (int(time.time()) - 86400,)
+    ).fetchone()[0]
+    return {
+        'active': active,
+        'callbacks': top_actions('callback'),
+        'commands': top_actions('command'),
+        'events_24h': events_24h,
+    }
+
+
+class UsageAnalytics:
+    """Buffers usage events in memory, writes them in batches and runs the periodic rollup"""
+
+    def __init__(self, db, flush_interval=FLUSH_INTERVAL, rollup_interval=ROLLUP_INTERVAL):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+        self._pending = []
+        self._stopping = asyncio.Event()
+        self._tasks = []
+
+    def record(self, user_id, action):
+        self._pending.append((user_id, action, int(time.time())))
+        if len(self._pending) >= MAX_PENDING:
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await self.db.executemany("INSERT INTO usage_events (user_id, action, ts) VALUES (?, ?, ?)", batch)
+        except BaseException:
+            self._pending[:0] = batch
+            raise
+
+    async def rollup(self):
+        await self.flush()
+        return await self.db.write(rollup)
+
+    async def report(self, days=7):
+        return await self.db.run(report, days)
+
+    async def _every(self, interval, job):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await job()
+            except Exception:
+                logger.exception("usage analytics %s failed", job.__name__)
+
+    def start(self):
+        self._stopping.clear()
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._every(self.flush_interval, self.flush)),
+            loop.create_task(self._every(self.rollup_interval, self.rollup)),
+        ]
+
+    async def stop(self):
+        """Stop the timers and write whatever is still pending (the rollup catches up on next start).
+        The timers are woken rather than cancelled, so a flush or rollup in progress completes."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
@@ -0,0 +1,394 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup # type: ignore
+from telegram.error import RetryAfter # type: ignore
+
+# Telegram allows about 30 messages per second across all chats
+GLOBAL_RATE_LIMIT = 25
+CONCURRENCY = 16
+MAX_RETRIES = 3
+# Seconds between delivery-state flushes / status message edits of a running job
+PROGRESS_INTERVAL = 3
+# Seconds between looks for jobs queued by other processes (runner only, see watch)
+PICKUP_INTERVAL = 2
+PAGE_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket; every send takes one token.
+    capacity defaults to 1 so sends are spread evenly instead of bursting."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while (flood control hit)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class BroadcastResult:
+    def __init__(self):
+        self.success = 0
+        self.failed = Counter()  # error class name -> count
+
+    @property
+    def fail_count(self):
+        return sum(self.failed.values())
+
+    @property
+    def total(self):
+        return self.success + self.fail_count
+
+
+class BroadcastEngine:
+    """Sends one message to many chats with bounded concurrency, paced by a
+    shared token bucket and honouring RetryAfter"""
+
+    def __init__(self, bot, rate=GLOBAL_RATE_LIMIT, concurrency=CONCURRENCY):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate)
+
+    async def send_one(self, chat_id, text, parse_mode='Markdown'):
+        """Deliver to a single chat, retrying on flood control.
+        Returns None on success or the error class name on failure."""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                return None
+            except RetryAfter as e:
+                delay = e.retry_after
+                if hasattr(delay, 'total_seconds'):
+                    delay = delay.total_seconds()
+                self.bucket.pause(delay)
+                if attempt == MAX_RETRIES:
+                    return type(e).__name__
+            except Exception as e:
+                return type(e).__name__
+
+    async def send(self, chat_ids, text, parse_mode='Markdown', on_result=None):
+        """Broadcast text to every chat id in chat_ids (iterable or async iterable).
+        on_result(chat_id, error) is called after each delivery attempt."""
+        result = BroadcastResult()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                chat_id = await queue.get()
+                if chat_id is None:
+                    return
+                error = await self.send_one(chat_id, text, parse_mode)
+                if error is None:
+                    result.success += 1
+                else:
+                    result.failed[error] += 1
+                if on_result:
+                    on_result(chat_id, error)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            if hasattr(chat_ids, '__aiter__'):
+                async for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            else:
+                for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return result
+
+
+class BroadcastJobs:
+    """Broadcasts persisted in broadcast_jobs / broadcast_deliveries.
+
+    Every recipient has a delivery row, so a job interrupted by a restart is
+    resumed with only the still-pending users and nobody gets it twice
+    (apart from sends in the last unflushed PROGRESS_INTERVAL window).
+    Jobs always live in the local SQLite database, whatever the storage
+    backend; only the recipient list is read from the repository. A running
+    job re-reads its status every PROGRESS_INTERVAL and stops once it is no
+    longer 'running', so a cancel made by another process takes effect too.
+
+    Only a runner sends. A process that isn't one (the sharded workers but
+    worker 0) just marks its jobs 'running'; the runner's watch() picks
+    them up, so every broadcast goes through a single token bucket.
+    """
+
+    def __init__(self, db, engine, runner=True):
+        self.db = db
+        self.engine = engine
+        self.runner = runner
+        self._tasks = {}  # job_id -> running asyncio.Task
+        self._watcher = None
+
+    async def create(self, text, chat_id, recipients):
+        """Snapshot recipients (an async iterator of user ids, e.g. the
+        repository's iter_user_ids()) into a new job, return (job_id, total)"""
+        job_id = await self.db.execute(
+            "INSERT INTO broadcast_jobs (text, chat_id, status) VALUES (?, ?, 'preparing')", (text, chat_id)
+        )
+        total = 0
+        page = []
+        async for user_id in recipients:
+            page.append((job_id, user_id))
+            if len(page) >= PAGE_SIZE:
+                total += await self.db.executemany(
+                    "INSERT OR IGNORE INTO broadcast_deliveries (job_id, user_id) VALUES (?, ?)", page
+                )
+                page = []
+        if page:
+            total += await self.db.executemany(
+                "INSERT OR IGNORE INTO broadcast_deliveries (job_id, user_id) VALUES (?, ?)", page
+            )
+
+        def _ready(conn):
+            # Stays 'preparing' until start() has its status message
+            if total:
+                conn.execute("UPDATE broadcast_jobs SET total = ? WHERE id = ?", (total, job_id))
+            else:
+                conn.execute("UPDATE broadcast_jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+        await self.db.write(_ready)
+        return job_id, total
+
+    async def start(self, job_id, status_message_id):
+        await self.db.execute(
+            "UPDATE broadcast_jobs SET status_message_id = ?, status = 'running' WHERE id = ?",
+            (status_message_id, job_id)
+        )
+        if self.runner:
+            self._spawn(job_id)
+
+    def _spawn(self, job_id):
+        if job_id in self._tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def resume(self):
+        """Start every 'running' job that has no task here: jobs interrupted by
+        the last stop, or queued by a process that isn't the runner"""
+        rows = await self.db.fetchall("SELECT id FROM broadcast_jobs WHERE status = 'running'")
+        for (job_id,) in rows:
+            self._spawn(job_id)
+        return len(rows)
+
+    def watch(self, interval=PICKUP_INTERVAL):
+        """Keep picking up jobs queued by other processes until stop()"""
+        async def _watch():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.resume()
+                except Exception:
+                    logger.exception("broadcast job pickup failed")
+        self._watcher = asyncio.get_running_loop().create_task(_watch())
+
+    async def cancel(self, job_id):
+        """Cancel a running job and write its final report into the status message.
+        Returns the job, or None if it was not running."""
+        cancelled = await self.db.write(lambda conn: conn.execute(
+            "UPDATE broadcast_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? AND status = 'running'", (job_id,)
+        ).rowcount)
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if not cancelled:
+            return None
+        job = await self._load(job_id)
+        await self._edit_status(job, await self.render_final(job, 'cancelled'))
+        return job
+
+    async def running(self):
+        return await self.db.fetchall(
+            "SELECT id, total, sent, failed FROM broadcast_jobs WHERE status = 'running' ORDER BY id"
+        )
+
+    async def stop(self):
+        """Interrupt running jobs on shutdown; they stay 'running' and resume on next start"""
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _pending_recipients(self, job_id):
+        """Stream of user ids still waiting for this job"""
+        return self.db.iter_keys('broadcast_deliveries', 'user_id', "job_id = ? AND status = 'pending'",
+                                 (job_id,), PAGE_SIZE)
+
+    async def _flush(self, job_id, results, job):
+        if not results:
+            return
+        batch = results[:]
+        del results[:]
+        sent = sum(1 for status, *_ in batch if status == 'sent')
+        failed = len(batch) - sent
+
+        def _write(conn):
+            conn.executemany(
+                "UPDATE broadcast_deliveries SET status = ?, error = ? WHERE job_id = ? AND user_id = ?", batch
+            )
+            conn.execute("UPDATE broadcast_jobs SET sent = sent + ?, failed = failed + ? WHERE id = ?",
+                         (sent, failed, job_id))
+        try:
+            await self.db.write(_write)
+        except asyncio.CancelledError:
+            # db.write is shielded, so the batch commits anyway: count it
+            job['sent'] += sent
+            job['failed'] += failed
+            raise
+        except Exception:
+            # Not written: keep the batch for the next flush rather than resend it after a resume
+            results[:0] = batch
+            raise
+        job['sent'] += sent
+        job['failed'] += failed
+
+    async def _edit_status(self, job, text, keyboard=None):
+        if not job['status_message_id']:
+            return
+        await self.engine.bucket.acquire()
+        try:
+            await self.engine.bot.edit_message_text(
+                text, chat_id=job['chat_id'], message_id=job['status_message_id'],
+                reply_markup=keyboard, parse_mode='Markdown'
+            )
+        except Exception as e:
+            # "message is not modified" and similar are harmless here
+            logger.debug("broadcast status edit failed: %s", e)
+
+    def render_progress(self, job, started, done_at_start):
+        processed = job['sent'] + job['failed']
+        remaining = job['total'] - processed
+        text = (
+            f"📤 **البث #{job['id']} قيد الإرسال**\n\n"
+            f"✅ ناجح: {job['sent']}\n"
+            f"❌ فاشل: {job['failed']}\n"
+            f"⏳ المتبقي: {remaining} من {job['total']}"
+        )
+        elapsed = time.monotonic() - started
+        done_now = processed - done_at_start
+        if done_now > 0 and elapsed > 0:
+            eta = int(remaining / (done_now / elapsed))
+            text += f"\n⏱️ الوقت المتوقع: {eta // 60}:{eta % 60:02d}"
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🛑 إلغاء البث", callback_data=f"cancel_broadcast_{job['id']}")]])
+        return text, keyboard
+
+    async def render_final(self, job, status):
+        errors = await self.db.fetchall(
+            "SELECT error, COUNT(*) FROM broadcast_deliveries WHERE job_id = ? AND status = 'failed' "
+            "GROUP BY error ORDER BY COUNT(*) DESC", (job['id'],)
+        )
+        title = "🛑 **تم إلغاء البث**" if status == 'cancelled' else "📊 **اكتمل البث**"
+        text = (
+            f"{title} #{job['id']}\n\n"
+            f"✅ ناجح: {job['sent']}\n"
+            f"❌ فاشل: {job['failed']}\n"
+            f"📝 الإجمالي: {job['total']}"
+        )
+        for error, count in errors:
+            text += f"\n   • {error}: {count}"
+        return text
+
+    async def _status(self, job_id):
+        row = await self.db.fetchone("SELECT status FROM broadcast_jobs WHERE id = ?", (job_id,))
+        return row[0] if row else None
+
+    async def _load(self, job_id):
+        row = await self.db.fetchone(
+            "SELECT id, text, chat_id, status_message_id, total, sent, failed FROM broadcast_jobs WHERE id = ?",
+            (job_id,)
+        )
+        return dict(zip(('id', 'text', 'chat_id', 'status_message_id', 'total', 'sent', 'failed'), row))
+
+    async def _run(self, job_id):
+        job = await self._load(job_id)
+        results = []
+        started = time.monotonic()
+        done_at_start = job['sent'] + job['failed']
+
+        def on_result(user_id, error):
+            results.append(('sent' if error is None else 'failed', error, job_id, user_id))
+
+        cancelled_elsewhere = False
+        stopping = asyncio.Event()
+
+        async def report():
+            nonlocal cancelled_elsewhere
+            while True:
+                try:
+                    await asyncio.wait_for(stopping.wait(), PROGRESS_INTERVAL)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    await self._flush(job_id, results, job)
+                    if await self._status(job_id) != 'running':
+                        # Cancelled by another process, which could only update the row
+                        cancelled_elsewhere = True
+                        sending.cancel()
+                        return
+                    await self._edit_status(job, *self.render_progress(job, started, done_at_start))
+                except Exception:
+                    logger.exception("broadcast job %s progress update failed", job_id)
+
+        sending = asyncio.ensure_future(
+            self.engine.send(self._pending_recipients(job_id), job['text'], on_result=on_result)
+        )
+        reporter = asyncio.ensure_future(report())
+        try:
+            await sending
+        except asyncio.CancelledError:
+            if not cancelled_elsewhere:
+                raise
+        finally:
+            # Woken rather than cancelled, so a flush in progress completes before the last one
+            stopping.set()
+            await asyncio.shield(reporter)
+            # Shielded so results are persisted even when this task is being cancelled
+            await asyncio.shield(self._flush(job_id, results, job))
+
+        if cancelled_elsewhere:
+            # Replace the canceller's report with the final counts
+            await self._edit_status(job, await self.render_final(job, 'cancelled'))
+            return
+
+        await self.db.execute(
+            "UPDATE broadcast_jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'",
+            (job_id,)
+        )
+        await self._edit_status(job, await self.render_final(job, 'done'))
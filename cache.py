@@ -0,0 +1,78 @@
+class ContentCache:
+    """In-process copy of bot_texts and bot_images.
+
+    Each table is loaded once on first read and served from memory after
+    that; the admin write paths call invalidate_* so the next read reloads.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._texts = None
+        self._images = None
+        # Bumped on every invalidation so a load that raced a write is discarded
+        self._texts_gen = 0
+        self._images_gen = 0
+
+    async def _load_texts(self):
+        gen = self._texts_gen
+        texts = await self.repo.get_texts()
+        if gen == self._texts_gen:
+            self._texts = texts
+        return texts
+
+    async def _load_images(self):
+        gen = self._images_gen
+        images = await self.repo.get_images()
+        if gen == self._images_gen:
+            self._images = images
+        return images
+
+    async def get_text(self, text_type):
+        texts = self._texts
+        if texts is None:
+            texts = await self._load_texts()
+        return texts.get(text_type)
+
+    async def get_image(self, image_type):
+        images = self._images
+        if images is None:
+            images = await self._load_images()
+        return images.get(image_type)
+
+    async def preload(self):
+        await self._load_texts()
+        await self._load_images()
+
+    def invalidate_texts(self):
+        self._texts = None
+        self._texts_gen += 1
+
+    def invalidate_images(self):
+        self._images = None
+        self._images_gen += 1
+
+
+class CatalogCache:
+    """Compiled catalogs (catalog.Catalog) by kind.
+
+    loaders maps a kind to a coroutine function that builds its catalog;
+    it is built on first use and rebuilt only after invalidate(kind).
+    """
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self._catalogs = {}
+        self._gens = dict.fromkeys(loaders, 0)
+
+    async def get(self, kind):
+        catalog = self._catalogs.get(kind)
+        if catalog is None:
+            gen = self._gens[kind]
+            catalog = await self.loaders[kind]()
+            if gen == self._gens[kind]:
+                self._catalogs[kind] = catalog
+        return catalog
+
+    def invalidate(self, kind):
+        self._catalogs.pop(kind, None)
+        self._gens[kind] += 1
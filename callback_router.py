@@ -0,0 +1,84 @@
+"""Callback query routing.
+
+Routes are registered once at startup. Exact callback_data values are a
+single dict lookup; parameterised buttons ("delete_file_12",
+"cancel_delete_faq") are matched by cutting their trailing arguments off
+and looking the remaining prefix up in a second dict, so dispatch cost does
+not grow with the number of screens.
+"""
+from collections import Counter, OrderedDict
+
+# Callback query ids remembered as answered
+MAX_ANSWERED = 10000
+
+
+class Route:
+    __slots__ = ('name', 'handler', 'admin', 'bound', 'args')
+
+    def __init__(self, name, handler, admin, bound=(), args=()):
+        self.name = name
+        self.handler = handler
+        self.admin = admin
+        self.bound = bound  # fixed arguments passed after (update, context)
+        self.args = args    # converters for the arguments encoded in callback_data
+
+
+class CallbackRouter:
+    def __init__(self):
+        self._exact = {}
+        self._prefixes = {}
+        self._max_args = 0
+        self.hits = Counter()  # route name -> dispatch count
+
+    def add(self, data, handler, *bound, admin=False):
+        """Route an exact callback_data value; bound values are passed to the handler"""
+        self._exact[data] = Route(data, handler, admin, bound)
+
+    def add_prefix(self, prefix, handler, args=(int,), admin=False):
+        """Route "<prefix><arg>[_<arg>...]"; each arg is decoded by the matching converter"""
+        self._prefixes[prefix] = Route(prefix + '*', handler, admin, args=tuple(args))
+        self._max_args = max(self._max_args, len(args))
+
+    def resolve(self, data):
+        """Return (route, args) for callback_data, or (None, ()) if nothing matches"""
+        route = self._exact.get(data)
+        if route:
+            return route, route.bound
+
+        head = data
+        tail = []
+        for _ in range(self._max_args):
+            head, sep, arg = head.rpartition('_')
+            if not sep:
+                break
+            tail.insert(0, arg)
+            route = self._prefixes.get(head + '_')
+            if route and len(route.args) == len(tail):
+                try:
+                    return route, tuple(convert(value) for convert, value in zip(route.args, tail))
+                except ValueError:
+                    break
+        return None, ()
+
+    def count(self, route):
+        self.hits[route.name] += 1
+
+    def top(self, n=5):
+        return self.hits.most_common(n)
+
+
+class AnsweredQueries:
+    """Ids of callback queries already answered; Telegram rejects a second answer"""
+
+    def __init__(self, max_entries=MAX_ANSWERED):
+        self.max_entries = max_entries
+        self._ids = OrderedDict()
+
+    def add(self, callback_query_id):
+        """Remember an id; False if it was already answered"""
+        if callback_query_id in self._ids:
+            return False
+        self._ids[callback_query_id] = True
+        if len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+        return True
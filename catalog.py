@@ -0,0 +1,77 @@
+"""Compiled package and FAQ catalogs.
+
+A Catalog is built once from the repository rows: the decoded items plus
+every view of them already rendered (each public page with its navigation
+keyboard, the admin list and the admin delete keyboard). Views are then
+served as-is until the catalog is invalidated by a write (see
+cache.CatalogCache), so showing prices or the FAQ does no JSON decoding or
+string building per request.
+"""
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup # type: ignore
+
+import keyboards
+
+SEPARATOR = "\n\n➖➖➖\n\n"
+
+
+class Catalog:
+    def __init__(self, items, pages, admin_list, delete_markup):
+        self.items = items
+        self.pages = pages
+        self.admin_list = admin_list
+        self.delete_markup = delete_markup
+
+    def page(self, page):
+        """(text, reply_markup) of a page (clamped to the valid range), or None when empty"""
+        if not self.pages:
+            return None
+        return self.pages[max(0, min(page, len(self.pages) - 1))]
+
+
+def render_pages(kind, title, entries, per_page):
+    count = (len(entries) + per_page - 1) // per_page
+    pages = []
+    for page in range(count):
+        text = title + (f" ({page + 1}/{count})" if count > 1 else "")
+        text += "\n\n" + SEPARATOR.join(entries[page * per_page:(page + 1) * per_page])
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️ السابق", callback_data=f"{kind}_page_{page - 1}"))
+        if page < count - 1:
+            nav.append(InlineKeyboardButton("التالي ▶️", callback_data=f"{kind}_page_{page + 1}"))
+        pages.append((text, InlineKeyboardMarkup([nav, [keyboards.HOME_BUTTON]]) if nav else keyboards.HOME))
+    return pages
+
+
+def delete_markup(buttons, back):
+    """One delete button per (label, callback_data), then a back button"""
+    rows = [[InlineKeyboardButton(label, callback_data=data)] for label, data in buttons]
+    rows.append([InlineKeyboardButton("🔙 رجوع", callback_data=back)])
+    return InlineKeyboardMarkup(rows)
+
+
+def render_package(package):
+    features_text = '\n'.join([f'• {feature}' for feature in package['features']])
+    return f"**{package['name']}**\n💰 السعر: {package['price']}\n⚡ السرعة: {package['speed']}\n\n✨ المميزات:\n{features_text}"
+
+
+def render_faq(faq):
+    return f"❓ **{faq['question']}**\n\n✅ {faq['answer']}"
+
+
+def compile_packages(packages, per_page):
+    return Catalog(
+        packages,
+        render_pages('prices', "💰 **باقاتنا المتاحة**", [render_package(p) for p in packages], per_page),
+        "💰 **الباقات المتاحة:**\n\n" + "".join(f"• {p['name']} - {p['price']}\n" for p in packages),
+        delete_markup([(f"🗑️ {p['name']}", f"delete_package_{p['id']}") for p in packages], "admin_packages"),
+    )
+
+
+def compile_faq(faqs, per_page):
+    return Catalog(
+        faqs,
+        render_pages('faq', "❓ **الأسئلة الشائعة**", [render_faq(f) for f in faqs], per_page),
+        "❓ **الأسئلة الشائعة:**\n\n" + "".join(f"• {f['question']}\n" for f in faqs),
+        delete_markup([(f"🗑️ {f['question'][:30]}...", f"delete_faq_{f['id']}") for f in faqs], "admin_faq"),
+    )
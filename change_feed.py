@@ -0,0 +1,71 @@
+"""Cross-process change feed for cached content.
+
+content_versions keeps one counter per content domain. Triggers on the
+underlying tables (created by migration 4) bump it on every
+insert/update/delete, whichever process or connection made the write. A
+running bot polls the feed through its
+storage repository (Repository.content_versions) and reloads the domains
+that moved. On SQLite, PRAGMA data_version first tells whether anything at
+all was committed since the last poll, and only then is the (tiny) version
+table read.
+"""
+import asyncio
+import logging
+
+POLL_INTERVAL = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """Polls content_versions and calls the reload callback of every domain that changed"""
+
+    def __init__(self, repo, interval=POLL_INTERVAL):
+        self.repo = repo
+        self.interval = interval
+        self._callbacks = {}  # domain -> reload callable (plain or async)
+        self._versions = {}
+        self._task = None
+
+    def on(self, domain, callback):
+        self._callbacks[domain] = callback
+
+    async def poll(self):
+        """Reload the domains whose version moved since the last poll; returns them"""
+        versions = await self.repo.content_versions()
+        if versions is None:
+            return []
+        changed = [d for d, v in versions.items() if self._versions.get(d, v) != v]
+        self._versions = versions
+        for domain in changed:
+            callback = self._callbacks.get(domain)
+            if callback:
+                try:
+                    result = callback()
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception:
+                    logger.exception("reloading %s failed", domain)
+        return changed
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("change feed poll failed")
+
+    async def start(self):
+        # The first poll only records the current versions
+        await self.poll()
+        self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,9 @@
+"""Settings shared by the bot (new_bot.py) and the command-line tools (ingest.py), read from the environment"""
+import os
+
+# Bot token
+BOT_TOKEN = os.getenv('BOT_TOKEN', "8248883880:AAGAVE3svXivHMk_E1ZHAzSBJbDnLJC64kw")
+
+# Storage for content and users: 'sqlite' (local DB_PATH file) or 'postgres' (shared, DATABASE_URL)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+DATABASE_URL = os.getenv('DATABASE_URL', '')
@@ -1,35 +1,25 @@
 import sqlite3
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import faq_search
+import migrations
+
+DB_PATH = 'bot_database.db'
+
+logger = logging.getLogger(__name__)
 
 def init_database():
     """إنشاء وتجهيز قاعدة البيانات"""
-    conn = sqlite3.connect('bot_database.db')
-    cursor = conn.cursor()
-    
-    # جدول ملفات الراوترات
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS router_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT NOT NULL,
-            router_name TEXT NOT NULL,
-            file_id TEXT NOT NULL,
-            description TEXT,
-            file_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # جدول الأسئلة الشائعة
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS faq (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            question TEXT NOT NULL,
-            answer TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    conn = sqlite3.connect(DB_PATH)
+    migrations.migrate(conn)
     
-    # إضافة بيانات نموذجية للأسئلة الشائعة
+    # إضافة بيانات نموذجية للأسئلة الشائعة (لقاعدة بيانات فارغة فقط)
     default_faq = [
         ('كيف أعيد تشغيل الراوتر؟', 'افصل الكهرباء لمدة 30 ثانية ثم أعد التوصيل.'),
         ('كيف أغير كلمة سر الواي فاي؟', 'ادخل على إعدادات الراوتر عبر 192.168.1.1 ثم قسم Wireless Settings.'),
@@ -38,14 +28,257 @@ def init_database():
         ('كيف أتصل بالدعم الفني؟', 'يمكنك الاتصال على 0123456789 أو 01112223344 للدعم الفني.')
     ]
     
-    cursor.executemany('''
-        INSERT OR IGNORE INTO faq (question, answer) 
-        VALUES (?, ?)
-    ''', default_faq)
+    with conn:
+        if conn.execute("SELECT COUNT(*) FROM faq").fetchone()[0] == 0:
+            for question, answer in default_faq:
+                faq_id = conn.execute('INSERT INTO faq (question, answer) VALUES (?, ?)', (question, answer)).lastrowid
+                faq_search.index_faq(conn, faq_id, question, answer)
     
-    conn.commit()
     conn.close()
     print("✅ تم إنشاء قاعدة البيانات بنجاح!")
 
+
+class Writer:
+    """The single writer of the database.
+
+    Mutations are queued to one thread that owns the only writing
+    connection. It takes whatever is queued (up to max_batch), runs each
+    mutation in its own savepoint inside one transaction and commits them
+    together, so concurrent writers never fight over SQLite's write lock and
+    a burst costs one fsync instead of one per write. A failing mutation
+    only rolls back its own savepoint. Callers are resolved after the
+    commit.
+    """
+
+    def __init__(self, path, max_batch=256):
+        self.path = path
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, args):
+        """Queue fn(conn, *args); returns a concurrent.futures.Future"""
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def _loop(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Commits are grouped, so every one of them can afford a real fsync
+        conn.execute('PRAGMA synchronous=FULL')
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._commit(conn, batch)
+                        return
+                    batch.append(item)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT mutation')
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                    conn.execute('RELEASE mutation')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO mutation')
+                    conn.execute('RELEASE mutation')
+                    outcomes.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            logger.exception("group commit of %d mutations failed", len(batch))
+            for fn, args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        """Commit everything still queued and stop the thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class Database:
+    """Persistent SQLite connection pool; queries run in worker threads off the event loop.
+    All mutations go through the single Writer."""
+
+    def __init__(self, path=DB_PATH, pool_size=4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='db')
+        self.writer = Writer(path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        # WAL lets pooled readers run alongside a writer
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection (blocking, for startup code and worker threads)"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _call(self, fn, args):
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn, *args):
+        """Run fn(conn, *args) on a pooled connection in the executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def iter_keys(self, table, key, where='1', params=(), page_size=1000):
+        """Stream an integer key column in key order, page_size rows per query.
+        Keyset pagination keeps every page an index range scan and memory flat."""
+        last_key = None
+        while True:
+            if last_key is None:
+                rows = await self.fetchall(
+                    f"SELECT {key} FROM {table} WHERE {where} ORDER BY {key} LIMIT ?",
+                    (*params, page_size)
+                )
+            else:
+                rows = await self.fetchall(
+                    f"SELECT {key} FROM {table} WHERE ({where}) AND {key} > ? ORDER BY {key} LIMIT ?",
+                    (*params, last_key, page_size)
+                )
+            for (value,) in rows:
+                yield value
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][0]
+
+    async def write(self, fn, *args):
+        """Run fn(conn, *args) as one atomic mutation of the writer's next group commit.
+        fn must not commit or roll back itself. Returns fn's result once it is durable.
+        Once submitted the mutation always commits: cancelling the caller only stops the wait."""
+        return await asyncio.shield(asyncio.wrap_future(self.writer.submit(fn, args)))
+
+    async def execute(self, sql, params=()):
+        """Execute a single write statement, return lastrowid"""
+        return await self.write(lambda conn: conn.execute(sql, params).lastrowid)
+
+    async def executemany(self, sql, seq_of_params):
+        return await self.write(lambda conn: conn.executemany(sql, seq_of_params).rowcount)
+
+    def close(self):
+        """Drain the writer, stop the executor and close every pooled connection"""
+        self.writer.close()
+        self._executor.shutdown(wait=True)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class UserStatsBuffer:
+    """Write-behind accumulator for user_stats: coalesces clicks per user and
+    flushes them with one executemany per window instead of one commit per click"""
+
+    def __init__(self, repo, flush_interval=5.0, max_pending=500):
+        self.repo = repo
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def record(self, user_id, username, first_name, last_name):
+        """Count one use; the row is written on the next flush"""
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        entry = self._pending.get(user_id)
+        if entry is None:
+            self._pending[user_id] = [username, first_name, last_name, 1, now, now]
+        else:
+            entry[0:3] = [username, first_name, last_name]
+            entry[3] += 1
+            entry[5] = now
+
+        if len(self._pending) >= self.max_pending and not self._lock.locked():
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            rows = [(user_id, *entry) for user_id, entry in batch.items()]
+            try:
+                await self.repo.upsert_user_stats(rows)
+            except BaseException:
+                # Put the batch back so the increments are retried next window
+                for user_id, entry in batch.items():
+                    newer = self._pending.get(user_id)
+                    if newer is not None:
+                        entry[0:3] = newer[0:3]
+                        entry[3] += newer[3]
+                        entry[5] = newer[5]
+                    self._pending[user_id] = entry
+                raise
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("user_stats flush failed")
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the timer and write whatever is still pending.
+        The loop is woken rather than cancelled, so a flush in progress completes."""
+        if self._task:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
 if __name__ == '__main__':
     init_database()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Full-text FAQ search on an SQLite FTS5 index.
+
+faq_fts holds a normalised copy of every faq row (rowid = faq.id). Arabic
+text is folded before indexing and before querying: diacritics and tatweel
+are dropped, alef/yeh/teh marbuta variants are unified and the definite
+article and common attached prefixes are stripped, so "الراوتر" matches
+"راوتر" and "إعادة" matches "اعاده".
+"""
+import re
+
+WORD_RE = re.compile(r'\w+')
+DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')  # harakat, Quranic marks, tatweel
+CHAR_MAP = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'})
+PREFIXES = ('وبال', 'ولل', 'وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+STOPWORDS = {
+    'كيف', 'ما', 'ماذا', 'هل', 'هو', 'هي', 'من', 'في', 'علي', 'الي', 'عن', 'او', 'ثم', 'اي', 'هذا', 'هذه',
+    'انا', 'لي', 'مع', 'كم', 'متي', 'اين', 'لماذا', 'the', 'a', 'an', 'is', 'to', 'how', 'what', 'of', 'my',
+}
+
+
+def normalize_word(word):
+    word = word.lower().translate(CHAR_MAP)
+    for prefix in PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            return word[len(prefix):]
+    return word
+
+
+def words(text):
+    # Marks are not \w, so strip them first or they would split words
+    return WORD_RE.findall(DIACRITICS_RE.sub('', text))
+
+
+def normalize(text):
+    return ' '.join(normalize_word(word) for word in words(text))
+
+
+def search_terms(text):
+    """Distinct normalised, searchable words of free text"""
+    terms = []
+    for word in words(text):
+        word = normalize_word(word)
+        if len(word) < 2 or word in STOPWORDS or word in terms:
+            continue
+        terms.append(word)
+    return terms
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 OR query of prefix terms, or None if nothing is searchable"""
+    terms = search_terms(text)
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def rebuild(conn):
+    """Re-index every faq row"""
+    conn.execute("DELETE FROM faq_fts")
+    conn.executemany(
+        "INSERT INTO faq_fts (rowid, question, answer) VALUES (?, ?, ?)",
+        [(faq_id, normalize(question), normalize(answer))
+         for faq_id, question, answer in conn.execute("SELECT id, question, answer FROM faq")]
+    )
+
+
+def index_faq(conn, faq_id, question, answer):
+    conn.execute(
+        "INSERT INTO faq_fts (rowid, question, answer) VALUES (?, ?, ?)",
+        (faq_id, normalize(question), normalize(answer))
+    )
+
+
+def unindex_faq(conn, faq_id):
+    conn.execute("DELETE FROM faq_fts WHERE rowid = ?", (faq_id,))
+
+
+def search(conn, text, limit=3):
+    """BM25-ranked FAQ matches for free text; question hits weigh double"""
+    match = build_match_query(text)
+    if not match:
+        return []
+    rows = conn.execute('''
+        SELECT faq.id, faq.question, faq.answer
+        FROM faq_fts JOIN faq ON faq.id = faq_fts.rowid
+        WHERE faq_fts MATCH ?
+        ORDER BY bm25(faq_fts, 2.0, 1.0)
+        LIMIT ?
+    ''', (match, limit)).fetchall()
+    return [{'id': r[0], 'question': r[1], 'answer': r[2]} for r in rows]
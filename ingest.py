@@ -0,0 +1,145 @@
+"""Bulk import of router files from a local directory.
+
+    python ingest.py DIR --chat-id CHAT_ID [--manifest FILE] [--concurrency N] [--dry-run]
+
+The manifest (DIR/manifest.csv by default, UTF-8) has one row per file:
+
+    file,type,router_name,description
+    tp-link/td-w8961n.bin,adsl,TP-Link TD-W8961N,إعدادات المصنع
+
+file is relative to DIR and type is adsl or ftth. Every listed file is
+hashed (SHA-256, in worker threads); files whose hash is already stored in
+router_files, or that duplicate another file of the same run, are skipped.
+The new ones are uploaded to CHAT_ID (a private storage chat or channel
+the bot can post to) with bounded concurrency to obtain their Telegram
+file_id, then all of them are recorded in router_files in one transaction.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from telegram import Bot # type: ignore
+from telegram.error import RetryAfter, TelegramError # type: ignore
+from telegram.request import HTTPXRequest # type: ignore
+
+import migrations
+from config import BOT_TOKEN, STORAGE_BACKEND, DATABASE_URL
+from database import Database, DB_PATH
+from storage import open_repository
+
+ROUTER_TYPES = ('adsl', 'ftth')
+CONCURRENCY = 4
+HASH_WORKERS = 4
+CHUNK_SIZE = 1024 * 1024
+UPLOAD_TIMEOUT = 120
+MAX_RETRIES = 3
+
+
+def read_manifest(directory, manifest):
+    """Manifest rows as dicts with a resolved 'path'; invalid rows are reported and skipped"""
+    entries = []
+    with open(manifest, newline='', encoding='utf-8-sig') as f:
+        for line, row in enumerate(csv.DictReader(f), 2):
+            path = directory / (row.get('file') or '').strip()
+            file_type = (row.get('type') or '').strip().lower()
+            router_name = (row.get('router_name') or '').strip()
+            if file_type not in ROUTER_TYPES or not router_name or not path.is_file():
+                print(f"⚠️ سطر {line} غير صالح أو الملف غير موجود: {row.get('file')}")
+                continue
+            entries.append({
+                'path': path,
+                'type': file_type,
+                'router_name': router_name,
+                'description': (row.get('description') or '').strip(),
+            })
+    return entries
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def hash_entries(entries):
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        hashes = await asyncio.gather(*[loop.run_in_executor(pool, sha256_file, e['path']) for e in entries])
+    for entry, sha256 in zip(entries, hashes):
+        entry['sha256'] = sha256
+
+
+async def upload(bot, chat_id, entry, semaphore):
+    """Send one file to the storage chat and return its file_id"""
+    async with semaphore:
+        for _ in range(MAX_RETRIES):
+            try:
+                message = await bot.send_document(
+                    chat_id, document=entry['path'], filename=entry['path'].name,
+                    caption=entry['router_name'], write_timeout=UPLOAD_TIMEOUT, read_timeout=UPLOAD_TIMEOUT
+                )
+                return message.document.file_id
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+        raise TelegramError(f"flood control persisted after {MAX_RETRIES} attempts")
+
+
+async def ingest(directory, manifest, chat_id, concurrency=CONCURRENCY, dry_run=False):
+    entries = read_manifest(directory, manifest)
+    await hash_entries(entries)
+
+    db = Database(DB_PATH)
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    repo = open_repository(STORAGE_BACKEND, db, DATABASE_URL)
+    await repo.start()
+    try:
+        seen = await repo.get_router_file_hashes()
+        new = []
+        for entry in entries:
+            if entry['sha256'] in seen:
+                continue
+            seen.add(entry['sha256'])
+            new.append(entry)
+        print(f"📂 {len(entries)} ملف في القائمة، {len(entries) - len(new)} مكرر أو موجود مسبقاً، {len(new)} جديد")
+        if dry_run or not new:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+        request = HTTPXRequest(connection_pool_size=concurrency + 1)
+        async with Bot(BOT_TOKEN, request=request) as bot:
+            results = await asyncio.gather(*[upload(bot, chat_id, e, semaphore) for e in new], return_exceptions=True)
+
+        rows = []
+        for entry, result in zip(new, results):
+            if isinstance(result, Exception):
+                print(f"❌ فشل رفع {entry['path']}: {result}")
+                continue
+            rows.append((entry['type'], entry['router_name'], result, entry['description'],
+                         entry['path'].name, entry['sha256']))
+        inserted = await repo.add_router_files(rows)
+        print(f"✅ تمت إضافة {inserted} ملف، فشل {len(new) - len(rows)}")
+    finally:
+        await repo.close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import router files from a directory")
+    parser.add_argument('directory', type=Path)
+    parser.add_argument('--chat-id', type=int, required=True, help="chat the files are uploaded to")
+    parser.add_argument('--manifest', type=Path, help="CSV manifest (default: DIR/manifest.csv)")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="parallel uploads")
+    parser.add_argument('--dry-run', action='store_true', help="only hash and report what is new")
+    args = parser.parse_args()
+    asyncio.run(ingest(args.directory, args.manifest or args.directory / 'manifest.csv',
+                       args.chat_id, args.concurrency, args.dry_run))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Static inline keyboards.
+
+Every markup here is built once at import time and shared between
+updates (InlineKeyboardMarkup is immutable). Keyboards that depend on
+data (file, package, FAQ and admin lists, confirmations, pagination)
+are still built per request in the handlers.
+"""
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup # type: ignore
+
+
+def _markup(*rows):
+    """Build a markup from rows of (text, callback_data) pairs"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=data) for text, data in row]
+        for row in rows
+    ])
+
+
+HOME_ROW = [("🏠 القائمة الرئيسية", "main_menu")]
+HOME_BUTTON = InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
+
+_MAIN_MENU_ROWS = [
+    [("⚙️ إعدادات الراوتر", "router_settings")],
+    [("💰 الأسعار والعروض", "prices_offers")],
+    [("❓ الأسئلة الشائعة", "faq")],
+    [("📞 اتصل بنا", "contact")],
+    [("🔗 مشاركة البوت", "share_bot")],
+]
+
+MAIN_MENU = _markup(*_MAIN_MENU_ROWS)
+MAIN_MENU_ADMIN = _markup(*_MAIN_MENU_ROWS, [("🛠️ لوحة الأدمن", "admin_main")])
+
+HOME = _markup(HOME_ROW)
+
+ROUTER_SETTINGS = _markup(
+    [("📶 ADSL", "router_adsl")],
+    [("🌐 FTTH", "router_ftth")],
+    HOME_ROW,
+)
+
+FAQ_SEARCH = _markup(
+    [("❓ كل الأسئلة الشائعة", "faq")],
+    HOME_ROW,
+)
+
+ADMIN_PANEL = _markup(
+    [("📝 إدارة النصوص", "admin_texts")],
+    [("🖼️ إدارة الصور", "admin_images")],
+    [("📁 إدارة الملفات", "admin_router_files")],
+    [("💰 إدارة الباقات", "admin_packages")],
+    [("❓ إدارة الأسئلة", "admin_faq")],
+    [("👥 إدارة الأدمن", "admin_management")],
+    [("📊 الإحصائيات", "admin_stats")],
+    [("🔧 الصيانة", "admin_maintenance")],
+    [("📢 البث", "admin_broadcast")],
+    HOME_ROW,
+)
+
+ADMIN_MAINTENANCE = _markup(
+    [("🔴 تفعيل الصيانة", "enable_maintenance")],
+    [("🟢 إلغاء الصيانة", "disable_maintenance")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_TEXTS = _markup(
+    [("✏️ نص البداية", "edit_welcome_text")],
+    [("✏️ نص الإعدادات", "edit_settings_text")],
+    [("✏️ نص الاتصال", "edit_contact_text")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_IMAGES = _markup(
+    [("🖼️ صورة البداية", "change_welcome_image")],
+    [("🗑️ حذف صورة البداية", "delete_welcome_image")],
+    [("📸 صورة الباقات", "change_packages_image")],
+    [("🗑️ حذف صورة الباقات", "delete_packages_image")],
+    [("🖼️ صورة الأسئلة", "change_faq_image")],
+    [("🗑️ حذف صورة الأسئلة", "delete_faq_image")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_ROUTER_FILES = _markup(
+    [("➕ إضافة ملف", "add_router_file")],
+    [("📋 عرض الملفات", "list_router_files")],
+    [("🗑️ حذف ملف", "delete_router_file")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_PACKAGES = _markup(
+    [("➕ إضافة باقة", "add_package")],
+    [("📋 عرض الباقات", "list_packages")],
+    [("🗑️ حذف باقة", "delete_package")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_FAQ = _markup(
+    [("➕ إضافة سؤال", "add_faq")],
+    [("📋 عرض الأسئلة", "list_faq")],
+    [("🗑️ حذف سؤال", "delete_faq")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_MANAGEMENT = _markup(
+    [("👥 عرض الأدمن", "list_admins")],
+    [("➕ إضافة أدمن", "add_admin")],
+    [("🗑️ حذف أدمن", "remove_admin")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ADMIN_STATS = _markup(
+    [("🔄 تحديث", "admin_stats")],
+    [("📈 تفاصيل المستخدمين", "user_details")],
+    [("📊 تحليلات الاستخدام", "admin_analytics")],
+    [("🔙 رجوع", "admin_main")],
+)
+
+ANALYTICS = _markup(
+    [("🔄 تحديث", "admin_analytics")],
+    [("🔙 رجوع للإحصائيات", "admin_stats")],
+)
+
+USER_DETAILS = _markup(
+    [("🔙 رجوع للإحصائيات", "admin_stats")],
+    [("🔙 لوحة الأدمن", "admin_main")],
+)
+
+_SECTIONS = (
+    "admin_main", "admin_texts", "admin_images", "admin_router_files",
+    "admin_packages", "admin_faq", "admin_management", "admin_broadcast",
+)
+
+# Single "back" / "cancel" button returning to an admin section, keyed by its callback
+BACK = {section: _markup([("🔙 رجوع", section)]) for section in _SECTIONS}
+CANCEL = {section: _markup([("🔙 إلغاء", section)]) for section in _SECTIONS}
+
+
+def main_menu(is_admin):
+    return MAIN_MENU_ADMIN if is_admin else MAIN_MENU
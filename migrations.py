@@ -0,0 +1,339 @@
+"""Numbered schema migrations, tracked in PRAGMA user_version.
+
+migrate() applies, in order and each in its own transaction, every
+migration newer than the database's user_version; an up-to-date database
+costs a single PRAGMA read. Migrations are append-only: never edit one
+that has shipped, add a new one instead. For the same reason each one
+spells out its own SQL rather than calling schema helpers elsewhere,
+which could change under it.
+
+Databases created before migrations existed have user_version 0 and
+already contain some of these tables, so the early migrations are written
+to be safe to apply on top of them.
+"""
+import logging
+
+import faq_search
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADMIN = (7653131217, "المالك")
+
+DEFAULT_TEXTS = [
+    ('welcome', '🎉 **مرحباً بك في بوت الخدمات!**\n\nاختر الخدمة التي تريدها من القائمة:'),
+    ('router_settings', '📡 **اختر نوع الاتصال:**\n• 📶 ADSL: للخطوط الهاتفية\n• 🌐 FTTH: للألياف الضوئية'),
+    ('contact', '📞 **أرقام التواصل:**\n📱 الهاتف: 0123456789\n📧 البريد: support@company.com')
+]
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def m001_core_tables(conn):
+    """Content, admin and user tables, with the default texts and admin"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admins (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_texts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT UNIQUE NOT NULL,
+            content TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT UNIQUE NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS router_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            router_name TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            description TEXT,
+            file_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS faq (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # The bot used to create faq without is_active (only database.py had it)
+    if 'is_active' not in _columns(conn, 'faq'):
+        conn.execute("ALTER TABLE faq ADD COLUMN is_active BOOLEAN DEFAULT 1")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS packages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price TEXT,
+            speed TEXT,
+            features TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            usage_count INTEGER DEFAULT 1,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO bot_texts (type, content) VALUES (?, ?)', DEFAULT_TEXTS)
+    ensure_default_admin(conn)
+
+
+def m002_broadcast_jobs(conn):
+    """Persistent broadcast jobs and their per-recipient delivery state"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            chat_id INTEGER NOT NULL,
+            status_message_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            total INTEGER DEFAULT 0,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+            job_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            PRIMARY KEY (job_id, user_id)
+        ) WITHOUT ROWID
+    ''')
+
+
+def m003_faq_search(conn):
+    """FAQ full-text index"""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS faq_fts USING fts5(
+            question, answer, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+    ''')
+    # Filled with the running normaliser: the index must match how queries are folded
+    indexed = conn.execute("SELECT COUNT(*) FROM faq_fts").fetchone()[0]
+    if indexed != conn.execute("SELECT COUNT(*) FROM faq").fetchone()[0]:
+        faq_search.rebuild(conn)
+
+
+def m004_change_feed(conn):
+    """Shared settings (maintenance mode) and per-domain change counters"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS content_versions (
+            domain TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # domain -> table whose writes bump it
+    domains = (
+        ('admins', 'admins'),
+        ('texts', 'bot_texts'),
+        ('images', 'bot_images'),
+        ('faq', 'faq'),
+        ('packages', 'packages'),
+        ('router_files', 'router_files'),
+        ('maintenance', 'bot_settings'),
+    )
+    conn.executemany("INSERT OR IGNORE INTO content_versions (domain) VALUES (?)", [(d,) for d, _ in domains])
+    for domain, table in domains:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE content_versions SET version = version + 1 WHERE domain = '{domain}';
+                END
+            ''')
+
+
+def m005_stats_counters(conn):
+    """Trigger-maintained counters for the statistics screen, counted once from the existing rows"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    def bump(name, delta):
+        return (
+            f"INSERT INTO stats_counters (name, value) VALUES ({name}, {delta}) "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + ({delta});"
+        )
+
+    # counter -> table whose rows it counts
+    row_counters = (
+        ('total_faq', 'faq'),
+        ('total_packages', 'packages'),
+        ('total_admins', 'admins'),
+        ('total_images', 'bot_images'),
+        ('total_texts', 'bot_texts'),
+        ('total_users', 'user_stats'),
+    )
+    triggers = []
+    for name, table in row_counters:
+        triggers.append((f'{table}_insert_counters', f'AFTER INSERT ON {table}', bump(f"'{name}'", 1)))
+        triggers.append((f'{table}_delete_counters', f'AFTER DELETE ON {table}', bump(f"'{name}'", -1)))
+    # Router files are counted per type ('files_adsl', 'files_ftth', ...)
+    triggers += [
+        ('router_files_insert_counters', 'AFTER INSERT ON router_files', bump("'files_' || NEW.type", 1)),
+        ('router_files_delete_counters', 'AFTER DELETE ON router_files', bump("'files_' || OLD.type", -1)),
+        ('router_files_update_counters', 'AFTER UPDATE OF type ON router_files',
+         bump("'files_' || OLD.type", -1) + bump("'files_' || NEW.type", 1)),
+    ]
+    # Total usage follows usage_count through the stats upserts
+    triggers += [
+        ('user_stats_usage_insert_counters', 'AFTER INSERT ON user_stats', bump("'total_usage'", 'NEW.usage_count')),
+        ('user_stats_usage_delete_counters', 'AFTER DELETE ON user_stats', bump("'total_usage'", '-OLD.usage_count')),
+        ('user_stats_usage_update_counters', 'AFTER UPDATE OF usage_count ON user_stats',
+         bump("'total_usage'", 'NEW.usage_count - OLD.usage_count')),
+    ]
+    for trigger, event, body in triggers:
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} {event} BEGIN {body} END")
+
+    conn.execute("DELETE FROM stats_counters")
+    for name, table in row_counters:
+        conn.execute(f"INSERT INTO stats_counters (name, value) SELECT ?, COUNT(*) FROM {table}", (name,))
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'total_usage', COALESCE(SUM(usage_count), 0) FROM user_stats")
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'files_' || type, COUNT(*) FROM router_files GROUP BY type")
+
+
+def m006_usage_analytics(conn):
+    """Usage event stream and its rollups"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_events (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_hourly (
+            hour INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            PRIMARY KEY (hour, action)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            day TEXT NOT NULL,
+            action TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            PRIMARY KEY (day, action)
+        ) WITHOUT ROWID
+    ''')
+    # Distinct users seen per day; the source for DAU/WAU
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_active_users (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_active (
+            day TEXT PRIMARY KEY,
+            dau INTEGER NOT NULL,
+            wau INTEGER NOT NULL
+        )
+    ''')
+
+
+def m007_lookup_indexes(conn):
+    """Indexes for router files by type and users by last activity"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_router_files_type ON router_files (type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_stats_last_seen ON user_stats (last_seen)")
+
+
+def m008_persisted_user_data(conn):
+    """Per-user conversation state (context.user_data)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS persisted_user_data (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def m009_router_file_hashes(conn):
+    """Content hash of router files, for de-duplicating bulk ingests"""
+    if 'sha256' not in _columns(conn, 'router_files'):
+        conn.execute("ALTER TABLE router_files ADD COLUMN sha256 TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_router_files_sha256 ON router_files (sha256)")
+
+
+MIGRATIONS = [
+    m001_core_tables,
+    m002_broadcast_jobs,
+    m003_faq_search,
+    m004_change_feed,
+    m005_stats_counters,
+    m006_usage_analytics,
+    m007_lookup_indexes,
+    m008_persisted_user_data,
+    m009_router_file_hashes,
+]
+
+
+def ensure_default_admin(conn):
+    """Re-add the owner if the admin table was emptied, so the bot can't lock everyone out"""
+    conn.execute(
+        "INSERT INTO admins (user_id, username) SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM admins)",
+        DEFAULT_ADMIN
+    )
+
+
+def migrate(conn):
+    """Bring the schema up to date; returns the resulting schema version"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        # Take the write lock up front and look again: another bot process
+        # starting at the same time may have applied it while we waited
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            applied = conn.execute("PRAGMA user_version").fetchone()[0] >= number
+            if not applied:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if not applied:
+            logger.info("Applied migration %d: %s", number, migration.__name__)
+    return max(version, len(MIGRATIONS))
@@ -1,15 +1,62 @@
 import logging
-import sqlite3
 import asyncio
 import sys
-import json
 import os
-from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup # type: ignore
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes # type: ignore
-
-# Bot token
-BOT_TOKEN = os.getenv('BOT_TOKEN', "8248883880:AAGAVE3svXivHMk_E1ZHAzSBJbDnLJC64kw")
+import signal
+import time
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaDocument # type: ignore
+from telegram.ext import Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters, ContextTypes # type: ignore
+from config import BOT_TOKEN, STORAGE_BACKEND, DATABASE_URL
+from database import Database, UserStatsBuffer, DB_PATH
+from storage import open_repository
+from persistence import SQLitePersistence
+from cache import ContentCache, CatalogCache
+from broadcast import BroadcastEngine, BroadcastJobs
+from webhook import WebhookServer, PendingAnswers
+from shards import ShardRouter
+from callback_router import CallbackRouter, AnsweredQueries
+from change_feed import ChangeFeed
+from throttle import UserThrottle
+from analytics import UsageAnalytics
+import analytics
+import stats_counters
+import migrations
+import keyboards
+import catalog
+
+# Update delivery: 'polling' (default) or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # public URL registered with Telegram; empty = local testing
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # required in webhook mode
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')  # behind a reverse proxy; 0.0.0.0 to expose directly
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+
+# Worker processes; above 1 a front process shards updates across them by user id
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', '1'))
+
+# Catalog items shown per page
+PACKAGES_PER_PAGE = 3
+FAQ_PER_PAGE = 5
+
+# Telegram accepts at most 10 items per sendMediaGroup
+MEDIA_GROUP_SIZE = 10
+
+# Seconds the admin statistics snapshot is reused for
+STATS_SNAPSHOT_TTL = 5
+
+# Per-user flood protection: action -> (sustained rate per second, burst).
+# Actions are 'command:<name>', 'callback:<route>' and 'message' for plain text.
+THROTTLE_LIMITS = {
+    'command:start': (1 / 10, 3),
+    'callback:main_menu': (1 / 2, 5),
+    'callback:router_adsl': (1 / 30, 2),  # re-sends every router document
+    'callback:router_ftth': (1 / 30, 2),
+    'callback:share_bot': (1 / 10, 2),
+    'command:share': (1 / 10, 2),
+    'message': (1 / 3, 5),
+}
+THROTTLE_DEFAULT = (1, 5)
 
 # Admin list
 ADMIN_LIST = [7653131217]
@@ -22,145 +69,215 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
+logger = logging.getLogger(__name__)
 
 class TelecomBot:
     def __init__(self, token):
         self.token = token
-        self.application = Application.builder().token(token).build()
-        self.maintenance_mode = False  # Maintenance mode flag
+        self.db = Database(DB_PATH)
+        self.repo = open_repository(STORAGE_BACKEND, self.db, DATABASE_URL)
+        self.user_stats = UserStatsBuffer(self.repo)
+        self.content = ContentCache(self.repo)
+        self.catalogs = CatalogCache({'prices': self.compile_prices, 'faq': self.compile_faq})
+        self.changes = ChangeFeed(self.repo)
+        self.throttle = UserThrottle(THROTTLE_LIMITS, THROTTLE_DEFAULT)
+        self.analytics = UsageAnalytics(self.db)
+        self._stats_snapshot = None
+        self._stats_snapshot_at = 0.0
+        self.application = (
+            Application.builder()
+            .token(token)
+            .persistence(SQLitePersistence(self.db))
+            .post_init(self.post_init)
+            .post_stop(self.post_stop)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
+        self.broadcaster = BroadcastEngine(self.application.bot)
+        self.broadcast_jobs = BroadcastJobs(self.db, self.broadcaster)
+        self.webhook = None  # WebhookServer when running in webhook mode
+        self.answered = AnsweredQueries()
+        self.webhook_answers = None  # PendingAnswers when answers can go back in the webhook response
+        self.share_text = None  # share message and keyboard, rendered by warm_up
+        self.share_markup = None
+        self.maintenance_mode = False  # Maintenance mode flag (local copy of bot_settings)
         self.init_database()
-        self.load_admins()
         self.setup_handlers()
         
     def init_database(self):
-        """Initialize database"""
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        # Admin table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Texts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_texts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT UNIQUE NOT NULL,
-                content TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Images table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT UNIQUE NOT NULL,
-                file_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Router files table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS router_files (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                router_name TEXT NOT NULL,
-                file_id TEXT NOT NULL,
-                description TEXT,
-                file_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # FAQ table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS faq (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Packages table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS packages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                price TEXT,
-                speed TEXT,
-                features TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # User statistics table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_stats (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                usage_count INTEGER DEFAULT 1,
-                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Insert default texts
-        default_texts = [
-            ('welcome', '🎉 **مرحباً بك في بوت الخدمات!**\n\nاختر الخدمة التي تريدها من القائمة:'),
-            ('router_settings', '📡 **اختر نوع الاتصال:**\n• 📶 ADSL: للخطوط الهاتفية\n• 🌐 FTTH: للألياف الضوئية'),
-            ('contact', '📞 **أرقام التواصل:**\n📱 الهاتف: 0123456789\n📧 البريد: support@company.com')
-        ]
-        
-        for text_type, content in default_texts:
-            cursor.execute('INSERT OR IGNORE INTO bot_texts (type, content) VALUES (?, ?)', (text_type, content))
-        
-        # Insert default admin
-        cursor.execute("SELECT COUNT(*) FROM admins")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute("INSERT INTO admins (user_id, username) VALUES (?, ?)", (7653131217, "المالك"))
-        
-        conn.commit()
-        conn.close()
+        """Initialize database (apply pending schema migrations)"""
+        with self.db.connection() as conn:
+            migrations.migrate(conn)
     
-    def load_admins(self):
+    async def load_admins(self):
         """Load admin list from database"""
         global ADMIN_LIST
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM admins")
-        admins = cursor.fetchall()
-        ADMIN_LIST = [admin[0] for admin in admins]
-        conn.close()
+        admins = await self.repo.get_admins()
+        ADMIN_LIST = [admin['user_id'] for admin in admins]
+
+    async def load_maintenance_mode(self):
+        """Load maintenance mode from database"""
+        self.maintenance_mode = await self.repo.get_setting('maintenance') == '1'
+
+    async def set_maintenance_mode(self, enabled):
+        """Persist maintenance mode so every bot process picks it up"""
+        self.maintenance_mode = enabled
+        await self.repo.set_setting('maintenance', '1' if enabled else '0')
     
     def is_admin(self, user_id):
         """Check admin permissions"""
         return user_id in ADMIN_LIST
 
-    def update_user_stats(self, user_id, username, first_name, last_name):
-        """Update user statistics"""
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_stats 
-            (user_id, username, first_name, last_name, usage_count, last_seen)
-            VALUES (?, ?, ?, ?, 
-                COALESCE((SELECT usage_count + 1 FROM user_stats WHERE user_id = ?), 1),
-                CURRENT_TIMESTAMP)
-        ''', (user_id, username, first_name, last_name, user_id))
-        
-        conn.commit()
-        conn.close()
+    async def update_user_stats(self, user_id, username, first_name, last_name):
+        """Update user statistics (buffered, written on the next flush)"""
+        self.user_stats.record(user_id, username, first_name, last_name)
+
+    def update_action(self, update):
+        """Action name of an update for throttling and analytics:
+        'callback:<route>', 'command:<name>' or 'message'"""
+        if update.callback_query:
+            route, _ = self.callbacks.resolve(update.callback_query.data or '')
+            return f"callback:{route.name if route else '?'}"
+        text = update.message.text if update.message else None
+        if text and text.startswith('/'):
+            return 'command:' + text[1:].split(None, 1)[0].split('@', 1)[0].lower()
+        return 'message'
+
+    async def preprocess(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Runs before any other handler (group -1).
+        Resolves the admin flag once into context.is_admin, records usage
+        (stats and analytics events) and
+        stops updates from non-admins while maintenance mode is on or while
+        they are being throttled."""
+        user = update.effective_user
+        context.is_admin = bool(user) and self.is_admin(user.id)
+        if not user:
+            return
+
+        if self.maintenance_mode and not context.is_admin:
+            if update.callback_query:
+                await self.answer_query(update.callback_query)
+                await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
+            elif update.message:
+                await update.message.reply_text(" **البوت تحت الصيانة**")
+            raise ApplicationHandlerStop
+
+        action = self.update_action(update)
+        if not context.is_admin:
+            allowed, warn = self.throttle.hit(user.id, action)
+            if not allowed:
+                if update.callback_query:
+                    await self.answer_query(update.callback_query, "⏳ الرجاء الانتظار قليلاً" if warn else None)
+                elif warn and update.message:
+                    await update.message.reply_text("⏳ الرجاء الانتظار قليلاً قبل المحاولة مجدداً")
+                raise ApplicationHandlerStop
+
+        await self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
+        self.analytics.record(user.id, action)
+
+    async def warm_up(self, application):
+        """Open storage and fill every cache before the first update, logging how long each step took"""
+        started = time.perf_counter()
+        timings = []
+
+        async def step(name, coro):
+            step_started = time.perf_counter()
+            await coro
+            timings.append(f"{name} {(time.perf_counter() - step_started) * 1000:.1f}ms")
+
+        await step('storage', self.repo.start())
+        await step('identity', self.load_identity(application.bot))
+        await step('admins', self.load_admins())
+        await step('maintenance', self.load_maintenance_mode())
+        await step('content', self.content.preload())
+        await step('catalogs', asyncio.gather(self.catalogs.get('prices'), self.catalogs.get('faq')))
+        logger.info(
+            "Warm-up done in %.1fms: %s", (time.perf_counter() - started) * 1000, ', '.join(timings)
+        )
+
+    async def load_identity(self, bot):
+        """Cache the bot's username and render the share message once"""
+        me = bot.bot  # fetched by getMe in Application.initialize
+        url = f"https://t.me/{me.username}"
+        self.share_text = f"🤖 **بوت الخدمات المتكامل**\n\n🔗 رابط البوت: {url}\n\n✅ خدماتنا:\n• ⚙️ إعدادات الراوتر\n• 💰 باقات الإنترنت\n• ❓ دعم فني\n• 📞 خدمة عملاء"
+        self.share_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔗 مشاركة الرابط", url=f"https://t.me/share/url?url={url}")],
+            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
+        ])
+
+    async def post_init(self, application):
+        """Runs inside the event loop before polling starts"""
+        await self.warm_up(application)
+        # Pick up writes made by other bot processes
+        self.changes.on('admins', self.load_admins)
+        self.changes.on('maintenance', self.load_maintenance_mode)
+        self.changes.on('texts', self.content.invalidate_texts)
+        self.changes.on('images', self.content.invalidate_images)
+        self.changes.on('packages', lambda: self.catalogs.invalidate('prices'))
+        self.changes.on('faq', lambda: self.catalogs.invalidate('faq'))
+        await self.changes.start()
+        self.user_stats.start()
+        self.analytics.start()
+        if self.broadcast_jobs.runner:
+            await self.broadcast_jobs.resume()
+            if BOT_WORKERS > 1:
+                # Jobs created on the other workers are queued in the database
+                self.broadcast_jobs.watch()
+
+    async def post_stop(self, application):
+        """Pause broadcasts while the bot can still send: shutdown closes its HTTP
+        client, and sends failing after that would be recorded as failed deliveries"""
+        await self.broadcast_jobs.stop()
+
+    async def post_shutdown(self, application):
+        """Flush buffered stats and release the connection pool"""
+        await self.changes.stop()
+        await self.user_stats.stop()
+        await self.analytics.stop()
+        await self.repo.close()
+        self.db.close()
+
+    async def run_webhook(self):
+        """Serve updates through the embedded webhook server instead of long polling"""
+        self.webhook_answers = PendingAnswers()
+        self.webhook = WebhookServer(self.application.bot, self.application.update_queue.put, WEBHOOK_SECRET,
+                                     path=WEBHOOK_PATH, answers=self.webhook_answers)
+        await self.application.initialize()
+        await self.post_init(self.application)
+        await self.application.start()
+        await self.webhook.start(WEBHOOK_LISTEN, WEBHOOK_PORT)
+        if WEBHOOK_URL:
+            await self.application.bot.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES
+            )
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.webhook.stop()
+            await self.application.stop()
+            await self.post_stop(self.application)
+            await self.application.shutdown()
+            await self.post_shutdown(self.application)
+
+    async def run_worker(self, inbox):
+        """Process the updates a shard front process routes to us (see shards.py)"""
+        await self.application.initialize()
+        await self.post_init(self.application)
+        await self.application.start()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                item = await loop.run_in_executor(None, inbox.get)
+                if item is None:
+                    break
+                await self.application.update_queue.put(Update.de_json(item, self.application.bot))
+        finally:
+            await self.application.stop()
+            await self.post_stop(self.application)
+            await self.application.shutdown()
+            await self.post_shutdown(self.application)
 
     def setup_handlers(self):
         """Setup command handlers"""
@@ -181,34 +298,87 @@ class TelecomBot:
             MessageHandler(filters.PHOTO, self.handle_photo)
         ]
         
+        # Maintenance gate, admin flag and usage stats for every update
+        self.application.add_handler(TypeHandler(Update, self.preprocess), group=-1)
         for handler in handlers:
             self.application.add_handler(handler)
 
+        self.setup_callbacks()
+
+    def setup_callbacks(self):
+        """Build the callback query routing table (once, at startup)"""
+        router = CallbackRouter()
+
+        # User screens
+        router.add("main_menu", self.start_from_query)
+        router.add("router_settings", self.router_settings_from_query)
+        router.add("router_adsl", self.show_router_files, 'adsl')
+        router.add("router_ftth", self.show_router_files, 'ftth')
+        router.add("prices_offers", self.show_prices_from_query)
+        router.add("faq", self.show_faq_from_query)
+        router.add("contact", self.show_contact_from_query)
+        router.add("share_bot", self.share_bot_from_query)
+        router.add_prefix("prices_page_", lambda u, c, page: self.show_catalog_page(u, c, 'prices', page))
+        router.add_prefix("faq_page_", lambda u, c, page: self.show_catalog_page(u, c, 'faq', page))
+
+        # Admin screens
+        admin_routes = {
+            "admin_main": self.admin_panel_from_query,
+            "admin_texts": self.admin_texts,
+            "admin_images": self.admin_images,
+            "admin_router_files": self.admin_router_files,
+            "admin_packages": self.admin_packages,
+            "admin_faq": self.admin_faq,
+            "admin_management": self.admin_management,
+            "admin_stats": self.admin_stats,
+            "admin_maintenance": self.admin_maintenance,
+            "admin_broadcast": self.admin_broadcast,
+            "user_details": self.user_details,
+            "admin_analytics": self.admin_analytics,
+            "edit_welcome_text": self.edit_welcome_text,
+            "edit_settings_text": self.edit_settings_text,
+            "edit_contact_text": self.edit_contact_text,
+            "change_welcome_image": self.change_welcome_image,
+            "change_packages_image": self.change_packages_image,
+            "change_faq_image": self.change_faq_image,
+            "delete_welcome_image": self.delete_welcome_image,
+            "delete_packages_image": self.delete_packages_image,
+            "delete_faq_image": self.delete_faq_image,
+            "add_router_file": self.add_router_file,
+            "list_router_files": self.list_router_files,
+            "delete_router_file": self.delete_router_file,
+            "add_package": self.add_package,
+            "list_packages": self.list_packages,
+            "delete_package": self.delete_package,
+            "add_faq": self.add_faq,
+            "list_faq": self.list_faq,
+            "delete_faq": self.delete_faq,
+            "list_admins": self.list_admins,
+            "add_admin": self.add_admin,
+            "remove_admin": self.remove_admin,
+            "enable_maintenance": self.enable_maintenance,
+            "disable_maintenance": self.disable_maintenance,
+            "send_broadcast": self.send_broadcast,
+        }
+        for data, handler in admin_routes.items():
+            router.add(data, handler, admin=True)
+
+        router.add_prefix("delete_file_", self.confirm_delete_file, admin=True)
+        router.add_prefix("delete_package_", self.confirm_delete_package, admin=True)
+        router.add_prefix("delete_faq_", self.confirm_delete_faq, admin=True)
+        router.add_prefix("delete_admin_", self.confirm_delete_admin, admin=True)
+        router.add_prefix("confirm_delete_", self.execute_delete, args=(str, int), admin=True)
+        router.add_prefix("cancel_delete_", self.cancel_delete, args=(str,), admin=True)
+        router.add_prefix("cancel_broadcast_", self.cancel_broadcast, admin=True)
+
+        self.callbacks = router
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start bot and show main menu"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        keyboard = [
-            [InlineKeyboardButton("⚙️ إعدادات الراوتر", callback_data="router_settings")],
-            [InlineKeyboardButton("💰 الأسعار والعروض", callback_data="prices_offers")],
-            [InlineKeyboardButton("❓ الأسئلة الشائعة", callback_data="faq")],
-            [InlineKeyboardButton("📞 اتصل بنا", callback_data="contact")],
-            [InlineKeyboardButton("🔗 مشاركة البوت", callback_data="share_bot")]
-        ]
+        reply_markup = keyboards.main_menu(context.is_admin)
+        welcome_text = await self.get_bot_text('welcome')
         
-        if self.is_admin(user.id):
-            keyboard.append([InlineKeyboardButton("🛠️ لوحة الأدمن", callback_data="admin_main")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        welcome_text = self.get_bot_text('welcome')
-        
-        welcome_image = self.get_bot_image('welcome')
+        welcome_image = await self.get_bot_image('welcome')
         if welcome_image:
             await update.message.reply_photo(
                 photo=welcome_image,
@@ -221,7 +391,7 @@ class TelecomBot:
 
     async def maintenance_control(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Control maintenance mode"""
-        if not self.is_admin(update.effective_user.id):
+        if not context.is_admin:
             await update.message.reply_text("⛔ ليس لديك صلاحية للوصول إلى هذا الأمر.")
             return
 
@@ -235,17 +405,17 @@ class TelecomBot:
 
         action = context.args[0].lower()
         if action == 'on':
-            self.maintenance_mode = True
+            await self.set_maintenance_mode(True)
             await update.message.reply_text("🔴 **تم تفعيل وضع الصيانة**\n\nفقط الأدمن يمكنهم استخدام البوت الآن.")
         elif action == 'off':
-            self.maintenance_mode = False
+            await self.set_maintenance_mode(False)
             await update.message.reply_text("🟢 **تم إلغاء وضع الصيانة**\n\nالبوت متاح الآن لجميع المستخدمين.")
         else:
             await update.message.reply_text("❌ أمر غير صالح. استخدم /maintenance on أو /maintenance off")
 
     async def broadcast_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Broadcast message to all users"""
-        if not self.is_admin(update.effective_user.id):
+        if not context.is_admin:
             await update.message.reply_text("⛔ ليس لديك صلاحية للوصول إلى هذا الأمر.")
             return
 
@@ -258,185 +428,62 @@ class TelecomBot:
             return
 
         message_text = ' '.join(context.args)
-        users = self.get_all_users()
+        await self.run_broadcast(update.message, message_text)
+
+    async def run_broadcast(self, message, text):
+        """Queue a persistent broadcast job; progress is edited into one status message"""
+        await self.user_stats.flush()
+        job_id, total = await self.broadcast_jobs.create(text, message.chat_id, self.repo.iter_user_ids())
         
-        if not users:
-            await update.message.reply_text("📭 لم يتم العثور على مستخدمين في قاعدة البيانات.")
+        if not total:
+            await message.reply_text("📭 لم يتم العثور على مستخدمين في قاعدة البيانات.")
             return
 
-        await update.message.reply_text(f"📤 بدء البث إلى {len(users)} مستخدم...")
-        
-        success_count = 0
-        fail_count = 0
-        
-        for user in users:
-            try:
-                await context.bot.send_message(
-                    chat_id=user['user_id'],
-                    parse_mode='Markdown'
-                )
-                success_count += 1
-                await asyncio.sleep(0.1)  # Rate limiting
-            except Exception as e:
-                fail_count += 1
-                continue
-
-        await update.message.reply_text(
-            f"📊 **اكتمل البث**\n\n"
-            f"✅ ناجح: {success_count}\n"
-            f"❌ فاشل: {fail_count}\n"
-            f"📝 الإجمالي: {len(users)}"
-        )
+        status = await message.reply_text(f"📤 بدء البث إلى {total} مستخدم...")
+        await self.broadcast_jobs.start(job_id, status.message_id)
 
     async def admin_panel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Admin control panel"""
-        if not self.is_admin(update.effective_user.id):
+        if not context.is_admin:
             await update.message.reply_text("⛔ ليس لديك صلاحية للوصول إلى هذه الصفحة.")
             return
 
-        keyboard = [
-            [InlineKeyboardButton("📝 إدارة النصوص", callback_data="admin_texts")],
-            [InlineKeyboardButton("🖼️ إدارة الصور", callback_data="admin_images")],
-            [InlineKeyboardButton("📁 إدارة الملفات", callback_data="admin_router_files")],
-            [InlineKeyboardButton("💰 إدارة الباقات", callback_data="admin_packages")],
-            [InlineKeyboardButton("❓ إدارة الأسئلة", callback_data="admin_faq")],
-            [InlineKeyboardButton("👥 إدارة الأدمن", callback_data="admin_management")],
-            [InlineKeyboardButton("📊 الإحصائيات", callback_data="admin_stats")],
-            [InlineKeyboardButton("🔧 الصيانة", callback_data="admin_maintenance")],  # New maintenance button
-            [InlineKeyboardButton("📢 البث", callback_data="admin_broadcast")],  # New broadcast button
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = keyboards.ADMIN_PANEL
         
         await update.message.reply_text("🛠️ **لوحة تحكم الأدمن**\n\nاختر القسم الذي تريد إدارته:", reply_markup=reply_markup, parse_mode='Markdown')
 
     async def router_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show connection types"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        keyboard = [
-            [InlineKeyboardButton("📶 ADSL", callback_data="router_adsl")],
-            [InlineKeyboardButton("🌐 FTTH", callback_data="router_ftth")],
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        text = self.get_bot_text('router_settings')
+        reply_markup = keyboards.ROUTER_SETTINGS
+        text = await self.get_bot_text('router_settings')
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_prices(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show packages"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        packages = self.get_packages_from_db()
-        if not packages:
-            await update.message.reply_text("📭 لا توجد باقات متاحة حالياً")
-            return
-        
-        packages_image = self.get_bot_image('packages')
-        if packages_image:
-            await update.message.reply_photo(photo=packages_image, caption="💰 **باقاتنا المتاحة**", parse_mode='Markdown')
-        else:
-            await update.message.reply_text("💰 **باقاتنا المتاحة**", parse_mode='Markdown')
-        
-        for package in packages:
-            features_text = '\n'.join([f'• {feature}' for feature in package['features']])
-            package_text = f"**{package['name']}**\n💰 السعر: {package['price']}\n⚡ السرعة: {package['speed']}\n\n✨ المميزات:\n{features_text}"
-            await update.message.reply_text(package_text, parse_mode='Markdown')
-        
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        await update.message.reply_text("اختر الخطوة التالية:", reply_markup=InlineKeyboardMarkup(keyboard))
+        await self.send_catalog(update, 'prices')
     
     async def show_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show FAQ"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        faqs = self.get_faq_from_db()
-        if not faqs:
-            await update.message.reply_text("📭 لا توجد أسئلة شائعة حالياً")
-            return
-        
-        faq_image = self.get_bot_image('faq')
-        if faq_image:
-            await update.message.reply_photo(photo=faq_image, caption="❓ **الأسئلة الشائعة**", parse_mode='Markdown')
-        else:
-            await update.message.reply_text("❓ **الأسئلة الشائعة**", parse_mode='Markdown')
-        
-        for faq in faqs:
-            await update.message.reply_text(f"❓ **{faq['question']}**\n\n✅ {faq['answer']}", parse_mode='Markdown')
-        
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        await update.message.reply_text("اختر الخطوة التالية:", reply_markup=InlineKeyboardMarkup(keyboard))
+        await self.send_catalog(update, 'faq')
     
     async def show_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show contact information"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        contact_info = self.get_bot_text('contact')
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        contact_info = await self.get_bot_text('contact')
+        reply_markup = keyboards.HOME
         await update.message.reply_text(contact_info, parse_mode='Markdown', reply_markup=reply_markup)
 
     async def share_bot(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Share bot link"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        bot_info = await context.bot.get_me()
-        bot_username = bot_info.username
-        share_text = f"🤖 **بوت الخدمات المتكامل**\n\n🔗 رابط البوت: https://t.me/{bot_username}\n\n✅ خدماتنا:\n• ⚙️ إعدادات الراوتر\n• 💰 باقات الإنترنت\n• ❓ دعم فني\n• 📞 خدمة عملاء"
-        
-        keyboard = [
-            [InlineKeyboardButton("🔗 مشاركة الرابط", url=f"https://t.me/share/url?url=https://t.me/{bot_username}")],
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         if update.message:
-            await update.message.reply_text(share_text, reply_markup=reply_markup, parse_mode='Markdown')
+            await update.message.reply_text(self.share_text, reply_markup=self.share_markup, parse_mode='Markdown')
         else:
-            await update.callback_query.edit_message_text(share_text, reply_markup=reply_markup, parse_mode='Markdown')
+            await update.callback_query.edit_message_text(self.share_text, reply_markup=self.share_markup, parse_mode='Markdown')
     
     async def get_my_id(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user ID"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(" **البوت تحت الصيانة**")
-            return
-            
         user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
         user_id = user.id
-        is_admin = self.is_admin(user_id)
+        is_admin = context.is_admin
         admin_status = "🔧 أنت أدمن ✅" if is_admin else "👤 مستخدم عادي"
         message = f"🔑 **معلومات حسابك:**\n\n**المعرف:** `{user_id}`\n**الحالة:** {admin_status}"
         
@@ -447,323 +494,239 @@ class TelecomBot:
 
         await update.message.reply_text(message, parse_mode='Markdown')
 
+    async def answer_query(self, query, text=None, show_alert=None):
+        """Answer a callback query once, in the webhook response when it is still waiting"""
+        if not self.answered.add(query.id):
+            return
+        if self.webhook_answers and self.webhook_answers.answer(query.id, text=text, show_alert=show_alert):
+            return
+        await query.answer(text, show_alert=show_alert)
+
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle all buttons"""
         query = update.callback_query
-        await query.answer()
         data = query.data
-        user = query.from_user
-        
-        # Check maintenance mode for non-admin users
-        if self.maintenance_mode and not self.is_admin(user.id):
-            await query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-        
-        # Update user statistics
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-
         print(f"🔘 زر مضغوط: {data}")
 
+        route, args = self.callbacks.resolve(data)
         # Check permissions for admin buttons
-        if data.startswith('admin_') and not self.is_admin(user.id):
-            await query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if route and route.admin and not context.is_admin:
+            await self.answer_query(query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
+        await self.answer_query(query)
 
-        handler_map = {
-            "main_menu": self.start_from_query,
-            "router_settings": self.router_settings_from_query,
-            "prices_offers": self.show_prices_from_query,
-            "faq": self.show_faq_from_query,
-            "contact": self.show_contact_from_query,
-            "share_bot": self.share_bot_from_query,
-            "admin_main": self.admin_panel_from_query,
-            "admin_texts": self.admin_texts,
-            "admin_images": self.admin_images,
-            "admin_router_files": self.admin_router_files,
-            "admin_packages": self.admin_packages,
-            "admin_faq": self.admin_faq,
-            "admin_management": self.admin_management,
-            "admin_stats": self.admin_stats,
-            "admin_maintenance": self.admin_maintenance,  # New maintenance handler
-            "admin_broadcast": self.admin_broadcast,  # New broadcast handler
-            "edit_welcome_text": self.edit_welcome_text,
-            "edit_settings_text": self.edit_settings_text,
-            "edit_contact_text": self.edit_contact_text,
-            "change_welcome_image": self.change_welcome_image,
-            "change_packages_image": self.change_packages_image,
-            "change_faq_image": self.change_faq_image,
-            "delete_welcome_image": self.delete_welcome_image,
-            "delete_packages_image": self.delete_packages_image,
-            "delete_faq_image": self.delete_faq_image,
-            "add_router_file": self.add_router_file,
-            "list_router_files": self.list_router_files,
-            "delete_router_file": self.delete_router_file,
-            "add_package": self.add_package,
-            "list_packages": self.list_packages,
-            "delete_package": self.delete_package,
-            "add_faq": self.add_faq,
-            "list_faq": self.list_faq,
-            "delete_faq": self.delete_faq,
-            "list_admins": self.list_admins,
-            "add_admin": self.add_admin,
-            "remove_admin": self.remove_admin,
-            "router_adsl": lambda u, c: self.show_router_files(u, c, 'adsl'),
-            "router_ftth": lambda u, c: self.show_router_files(u, c, 'ftth'),
-            "enable_maintenance": self.enable_maintenance,  # Enable maintenance
-            "disable_maintenance": self.disable_maintenance,  # Disable maintenance
-            "send_broadcast": self.send_broadcast,  # Send broadcast
-        }
-        
-        if data.startswith('delete_file_'):
-            file_id = int(data.split('_')[2])
-            await self.confirm_delete_file(update, context, file_id)
-        elif data.startswith('delete_package_'):
-            package_id = int(data.split('_')[2])
-            await self.confirm_delete_package(update, context, package_id)
-        elif data.startswith('delete_faq_'):
-            faq_id = int(data.split('_')[2])
-            await self.confirm_delete_faq(update, context, faq_id)
-        elif data.startswith('delete_admin_'):
-            admin_id = int(data.split('_')[2])
-            await self.confirm_delete_admin(update, context, admin_id)
-        elif data.startswith('confirm_delete_'):
-            parts = data.split('_')
-            action = parts[2]
-            item_id = int(parts[3])
-            await self.execute_delete(update, context, action, item_id)
-        elif data.startswith('cancel_delete_'):
-            await self.cancel_delete(update, context, data.split('_')[2])
-        elif data in handler_map:
-            await handler_map[data](update, context)
-        else:
+        if route is None:
             await query.edit_message_text("⚠️ هذا الزر غير مدعوم حالياً")
+            return
+
+        self.callbacks.count(route)
+        await route.handler(update, context, *args)
 
     # Admin functions
     async def admin_maintenance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Maintenance control panel"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         status = "🟢 **نشط**" if not self.maintenance_mode else "🔴 **وضع الصيانة**"
-        keyboard = [
-            [InlineKeyboardButton("🔴 تفعيل الصيانة", callback_data="enable_maintenance")],
-            [InlineKeyboardButton("🟢 إلغاء الصيانة", callback_data="disable_maintenance")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
         
         message = f"🔧 **تحكم في الصيانة**\n\nالحالة الحالية: {status}\n\n"
         message += "• في وضع الصيانة، فقط الأدمن يمكنهم استخدام البوت\n"
         message += "• المستخدمين العاديين سيرون رسالة الصيانة"
         
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(message, reply_markup=keyboards.ADMIN_MAINTENANCE, parse_mode='Markdown')
 
     async def enable_maintenance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Enable maintenance mode"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        self.maintenance_mode = True
+        await self.set_maintenance_mode(True)
         await update.callback_query.edit_message_text("🔴 **تم تفعيل وضع الصيانة**\n\nفقط الأدمن يمكنهم استخدام البوت الآن.")
         await self.admin_maintenance(update, context)
 
     async def disable_maintenance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Disable maintenance mode"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        self.maintenance_mode = False
+        await self.set_maintenance_mode(False)
         await update.callback_query.edit_message_text("🟢 **تم إلغاء وضع الصيانة**\n\nالبوت متاح الآن لجميع المستخدمين.")
         await self.admin_maintenance(update, context)
 
     async def admin_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Broadcast message panel"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        users_count = len(self.get_all_users())
-        keyboard = [
-            [InlineKeyboardButton("📢 إرسال بث", callback_data="send_broadcast")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
+        users_count = await self.count_users()
+        running_jobs = await self.broadcast_jobs.running()
+        keyboard = [[InlineKeyboardButton("📢 إرسال بث", callback_data="send_broadcast")]]
+        for job_id, total, sent, failed in running_jobs:
+            keyboard.append([InlineKeyboardButton(f"🛑 إلغاء البث #{job_id} ({sent + failed}/{total})", callback_data=f"cancel_broadcast_{job_id}")])
+        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")])
         
         message = f"📢 **بث الرسائل**\n\n"
-        message += f"إجمالي المستخدمين: {users_count}\n\n"
+        message += f"إجمالي المستخدمين: {users_count}\n"
+        message += f"البث الجاري: {len(running_jobs)}\n\n"
         message += "يمكنك إرسال رسالة إلى جميع المستخدمين باستخدام:\n"
         message += "• هذه اللوحة\n• أمر /broadcast\n\n"
         message += "ملاحظة: قد يستغرق هذا بعض الوقت لقاعدة المستخدمين الكبيرة."
         
         await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
 
+    async def cancel_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE, job_id):
+        """Cancel a running broadcast job"""
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
+            return
+
+        job = await self.broadcast_jobs.cancel(job_id)
+        # The final report replaces the job's status message; refresh the panel if cancelled from there
+        if not job or job['status_message_id'] != update.callback_query.message.message_id:
+            await self.admin_broadcast(update, context)
+
     async def send_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Send broadcast from panel"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'send_broadcast'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_broadcast")]]
-        await update.callback_query.edit_message_text("📢 **إرسال بث**\n\nأرسل الرسالة التي تريد بثها إلى جميع المستخدمين:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("📢 **إرسال بث**\n\nأرسل الرسالة التي تريد بثها إلى جميع المستخدمين:", reply_markup=keyboards.CANCEL["admin_broadcast"], parse_mode='Markdown')
 
     async def admin_texts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage texts"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("✏️ نص البداية", callback_data="edit_welcome_text")],
-            [InlineKeyboardButton("✏️ نص الإعدادات", callback_data="edit_settings_text")],
-            [InlineKeyboardButton("✏️ نص الاتصال", callback_data="edit_contact_text")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("📝 **إدارة النصوص**\n\nاختر النص الذي تريد تعديله:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("📝 **إدارة النصوص**\n\nاختر النص الذي تريد تعديله:", reply_markup=keyboards.ADMIN_TEXTS, parse_mode='Markdown')
 
     async def edit_welcome_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Edit welcome text"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'edit_welcome_text'
-        current_text = self.get_bot_text('welcome')
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_texts")]]
-        await update.callback_query.edit_message_text(f"✏️ **تعديل نص البداية**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        current_text = await self.get_bot_text('welcome')
+        await update.callback_query.edit_message_text(f"✏️ **تعديل نص البداية**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=keyboards.CANCEL["admin_texts"], parse_mode='Markdown')
 
     async def edit_settings_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Edit settings text"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'edit_settings_text'
-        current_text = self.get_bot_text('router_settings')
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_texts")]]
-        await update.callback_query.edit_message_text(f"✏️ **تعديل نص الإعدادات**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        current_text = await self.get_bot_text('router_settings')
+        await update.callback_query.edit_message_text(f"✏️ **تعديل نص الإعدادات**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=keyboards.CANCEL["admin_texts"], parse_mode='Markdown')
 
     async def edit_contact_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Edit contact text"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'edit_contact_text'
-        current_text = self.get_bot_text('contact')
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_texts")]]
-        await update.callback_query.edit_message_text(f"✏️ **تعديل نص الاتصال**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        current_text = await self.get_bot_text('contact')
+        await update.callback_query.edit_message_text(f"✏️ **تعديل نص الاتصال**\n\nالنص الحالي:\n{current_text}\n\nأرسل النص الجديد:", reply_markup=keyboards.CANCEL["admin_texts"], parse_mode='Markdown')
 
     async def admin_images(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage images"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("🖼️ صورة البداية", callback_data="change_welcome_image")],
-            [InlineKeyboardButton("🗑️ حذف صورة البداية", callback_data="delete_welcome_image")],
-            [InlineKeyboardButton("📸 صورة الباقات", callback_data="change_packages_image")],
-            [InlineKeyboardButton("🗑️ حذف صورة الباقات", callback_data="delete_packages_image")],
-            [InlineKeyboardButton("🖼️ صورة الأسئلة", callback_data="change_faq_image")],
-            [InlineKeyboardButton("🗑️ حذف صورة الأسئلة", callback_data="delete_faq_image")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("🖼️ **إدارة الصور**\n\nاختر الصورة التي تريد إدارتها:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🖼️ **إدارة الصور**\n\nاختر الصورة التي تريد إدارتها:", reply_markup=keyboards.ADMIN_IMAGES, parse_mode='Markdown')
 
     async def change_welcome_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Change welcome image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'change_welcome_image'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_images")]]
-        await update.callback_query.edit_message_text("🖼️ **تغيير صورة البداية**\n\nأرسل الصورة الجديدة:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🖼️ **تغيير صورة البداية**\n\nأرسل الصورة الجديدة:", reply_markup=keyboards.CANCEL["admin_images"], parse_mode='Markdown')
 
     async def change_packages_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Change packages image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'change_packages_image'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_images")]]
-        await update.callback_query.edit_message_text("📸 **تغيير صورة الباقات**\n\nأرسل الصورة الجديدة:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("📸 **تغيير صورة الباقات**\n\nأرسل الصورة الجديدة:", reply_markup=keyboards.CANCEL["admin_images"], parse_mode='Markdown')
 
     async def change_faq_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Change FAQ image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'change_faq_image'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_images")]]
-        await update.callback_query.edit_message_text("🖼️ **تغيير صورة الأسئلة**\n\nأرسل الصورة الجديدة:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🖼️ **تغيير صورة الأسئلة**\n\nأرسل الصورة الجديدة:", reply_markup=keyboards.CANCEL["admin_images"], parse_mode='Markdown')
 
     async def delete_welcome_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete welcome image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        self.delete_bot_image('welcome')
+        await self.delete_bot_image('welcome')
         await update.callback_query.edit_message_text("✅ تم حذف صورة البداية بنجاح!")
         await self.admin_images(update, context)
 
     async def delete_packages_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete packages image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        self.delete_bot_image('packages')
+        await self.delete_bot_image('packages')
         await update.callback_query.edit_message_text("✅ تم حذف صورة الباقات بنجاح!")
         await self.admin_images(update, context)
 
     async def delete_faq_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete FAQ image"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        self.delete_bot_image('faq')
+        await self.delete_bot_image('faq')
         await update.callback_query.edit_message_text("✅ تم حذف صورة الأسئلة بنجاح!")
         await self.admin_images(update, context)
 
     async def admin_router_files(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage router files"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("➕ إضافة ملف", callback_data="add_router_file")],
-            [InlineKeyboardButton("📋 عرض الملفات", callback_data="list_router_files")],
-            [InlineKeyboardButton("🗑️ حذف ملف", callback_data="delete_router_file")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("📁 **إدارة ملفات الراوتر**\n\nاختر العملية:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("📁 **إدارة ملفات الراوتر**\n\nاختر العملية:", reply_markup=keyboards.ADMIN_ROUTER_FILES, parse_mode='Markdown')
 
     async def add_router_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Add router file"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'add_router_file'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_router_files")]]
         instructions = "📥 **إضافة ملف راوتر**\n\nأرسل البيانات بالتنسيق:\nنوع_الاتصال (adsl/ftth)\nاسم الراوتر\nوصف الملف"
-        await update.callback_query.edit_message_text(instructions, reply_markup=InlineKeyboardMarkup(keyboard))
+        await update.callback_query.edit_message_text(instructions, reply_markup=keyboards.CANCEL["admin_router_files"])
 
     async def list_router_files(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """List router files"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        files = self.get_all_router_files()
+        files = await self.get_all_router_files()
         if not files:
             await update.callback_query.edit_message_text("📭 لا توجد ملفات")
             return
@@ -772,16 +735,15 @@ class TelecomBot:
         for file in files:
             message += f"• {file['type'].upper()}: {file['router_name']}\n"
         
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="admin_router_files")]]
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(message, reply_markup=keyboards.BACK["admin_router_files"], parse_mode='Markdown')
 
     async def delete_router_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete router file"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        files = self.get_all_router_files()
+        files = await self.get_all_router_files()
         if not files:
             await update.callback_query.edit_message_text("📭 لا توجد ملفات")
             return
@@ -795,171 +757,129 @@ class TelecomBot:
 
     async def admin_packages(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage packages"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("➕ إضافة باقة", callback_data="add_package")],
-            [InlineKeyboardButton("📋 عرض الباقات", callback_data="list_packages")],
-            [InlineKeyboardButton("🗑️ حذف باقة", callback_data="delete_package")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("💰 **إدارة الباقات**\n\nاختر العملية:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("💰 **إدارة الباقات**\n\nاختر العملية:", reply_markup=keyboards.ADMIN_PACKAGES, parse_mode='Markdown')
 
     async def add_package(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Add new package"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'add_package'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_packages")]]
         instructions = "💰 **إضافة باقة جديدة**\n\nأرسل البيانات بالتنسيق:\nاسم الباقة\nالسعر\nالسرعة\nالمميزات (مفصولة بفاصلة)"
-        await update.callback_query.edit_message_text(instructions, reply_markup=InlineKeyboardMarkup(keyboard))
+        await update.callback_query.edit_message_text(instructions, reply_markup=keyboards.CANCEL["admin_packages"])
 
     async def list_packages(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """List packages"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        packages = self.get_packages_from_db()
-        if not packages:
+        packages = await self.catalogs.get('prices')
+        if not packages.items:
             await update.callback_query.edit_message_text("📭 لا توجد باقات")
             return
         
-        message = "💰 **الباقات المتاحة:**\n\n"
-        for pkg in packages:
-            message += f"• {pkg['name']} - {pkg['price']}\n"
-        
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="admin_packages")]]
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(packages.admin_list, reply_markup=keyboards.BACK["admin_packages"], parse_mode='Markdown')
 
     async def delete_package(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete package"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        packages = self.get_packages_from_db()
-        if not packages:
+        packages = await self.catalogs.get('prices')
+        if not packages.items:
             await update.callback_query.edit_message_text("📭 لا توجد باقات")
             return
         
-        keyboard = []
-        for pkg in packages:
-            keyboard.append([InlineKeyboardButton(f"🗑️ {pkg['name']}", callback_data=f"delete_package_{pkg['id']}")])
-        
-        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="admin_packages")])
-        await update.callback_query.edit_message_text("🗑️ **حذف باقة**\n\nاختر الباقة التي تريد حذفها:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🗑️ **حذف باقة**\n\nاختر الباقة التي تريد حذفها:", reply_markup=packages.delete_markup, parse_mode='Markdown')
 
     async def admin_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage FAQ"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("➕ إضافة سؤال", callback_data="add_faq")],
-            [InlineKeyboardButton("📋 عرض الأسئلة", callback_data="list_faq")],
-            [InlineKeyboardButton("🗑️ حذف سؤال", callback_data="delete_faq")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("❓ **إدارة الأسئلة الشائعة**\n\nاختر العملية:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("❓ **إدارة الأسئلة الشائعة**\n\nاختر العملية:", reply_markup=keyboards.ADMIN_FAQ, parse_mode='Markdown')
 
     async def add_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Add new FAQ"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'add_faq'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_faq")]]
         instructions = "❓ **إضافة سؤال شائع**\n\nأرسل البيانات بالتنسيق:\nالسؤال\nالجواب"
-        await update.callback_query.edit_message_text(instructions, reply_markup=InlineKeyboardMarkup(keyboard))
+        await update.callback_query.edit_message_text(instructions, reply_markup=keyboards.CANCEL["admin_faq"])
 
     async def list_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """List FAQ"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        faqs = self.get_faq_from_db()
-        if not faqs:
+        faqs = await self.catalogs.get('faq')
+        if not faqs.items:
             await update.callback_query.edit_message_text("📭 لا توجد أسئلة")
             return
         
-        message = "❓ **الأسئلة الشائعة:**\n\n"
-        for faq in faqs:
-            message += f"• {faq['question']}\n"
-        
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="admin_faq")]]
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(faqs.admin_list, reply_markup=keyboards.BACK["admin_faq"], parse_mode='Markdown')
 
     async def delete_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete FAQ"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        faqs = self.get_faq_from_db()
-        if not faqs:
+        faqs = await self.catalogs.get('faq')
+        if not faqs.items:
             await update.callback_query.edit_message_text("📭 لا توجد أسئلة")
             return
         
-        keyboard = []
-        for faq in faqs:
-            keyboard.append([InlineKeyboardButton(f"🗑️ {faq['question'][:30]}...", callback_data=f"delete_faq_{faq['id']}")])
-        
-        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="admin_faq")])
-        await update.callback_query.edit_message_text("🗑️ **حذف سؤال**\n\nاختر السؤال الذي تريد حذفه:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🗑️ **حذف سؤال**\n\nاختر السؤال الذي تريد حذفه:", reply_markup=faqs.delete_markup, parse_mode='Markdown')
 
     async def admin_management(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manage admins"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("👥 عرض الأدمن", callback_data="list_admins")],
-            [InlineKeyboardButton("➕ إضافة أدمن", callback_data="add_admin")],
-            [InlineKeyboardButton("🗑️ حذف أدمن", callback_data="remove_admin")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text("👥 **إدارة الأدمن**\n\nاختر العملية:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("👥 **إدارة الأدمن**\n\nاختر العملية:", reply_markup=keyboards.ADMIN_MANAGEMENT, parse_mode='Markdown')
 
     async def list_admins(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """List admins"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        admins = self.get_admins_from_db()
+        admins = await self.get_admins_from_db()
         message = "👥 **قائمة الأدمن:**\n\n"
         for admin in admins:
             message += f"• `{admin['user_id']}` - {admin['username'] or 'بدون معرف'}\n"
         
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="admin_management")]]
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(message, reply_markup=keyboards.BACK["admin_management"], parse_mode='Markdown')
 
     async def add_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Add new admin"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         context.user_data['awaiting_input'] = 'add_admin'
-        keyboard = [[InlineKeyboardButton("🔙 إلغاء", callback_data="admin_management")]]
-        await update.callback_query.edit_message_text("➕ **إضافة أدمن جديد**\n\nأرسل معرف المستخدم الرقمي:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("➕ **إضافة أدمن جديد**\n\nأرسل معرف المستخدم الرقمي:", reply_markup=keyboards.CANCEL["admin_management"], parse_mode='Markdown')
 
     async def remove_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Remove admin"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        admins = self.get_admins_from_db()
+        admins = await self.get_admins_from_db()
         if len(admins) <= 1:
             await update.callback_query.edit_message_text("⚠️ لا يمكن حذف آخر أدمن")
             return
@@ -974,12 +894,12 @@ class TelecomBot:
 
     async def admin_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show statistics"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        stats = self.get_bot_stats()
-        user_stats = self.get_user_stats()
+        stats = await self.get_bot_stats()
+        user_stats = await self.get_user_stats()
         
         stats_text = f"""
 📊 **إحصائيات البوت**
@@ -1001,230 +921,186 @@ class TelecomBot:
    • الصور: {stats['total_images']}
    • النصوص: {stats['total_texts']}
 """
-        keyboard = [
-            [InlineKeyboardButton("🔄 تحديث", callback_data="admin_stats")],
-            [InlineKeyboardButton("📈 تفاصيل المستخدمين", callback_data="user_details")],
-            [InlineKeyboardButton("🔙 رجوع", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text(stats_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        top_routes = self.callbacks.top(5)
+        if top_routes:
+            stats_text += "\n🔘 **الأزرار الأكثر استخداماً (منذ التشغيل):**\n"
+            for name, hits in top_routes:
+                stats_text += f"   • `{name}`: {hits}\n"
+        await update.callback_query.edit_message_text(stats_text, reply_markup=keyboards.ADMIN_STATS, parse_mode='Markdown')
+
+    async def admin_analytics(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show usage analytics (read from the rollup tables)"""
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
+            return
+
+        report = await self.analytics.report(days=7)
+        message = "📈 **تحليلات الاستخدام (آخر 7 أيام)**\n\n"
+        message += f"⚡ الأحداث خلال 24 ساعة: {report['events_24h']}\n\n"
+        message += "👥 **المستخدمين النشطين (يومي / أسبوعي):**\n"
+        for day, dau, wau in report['active']:
+            message += f"   • {day}: {dau} / {wau}\n"
+        if not report['active']:
+            message += "   • لا توجد بيانات بعد\n"
+        for title, rows in (("🔘 **الأزرار الأكثر استخداماً:**", report['callbacks']),
+                            ("⌨️ **الأوامر الأكثر استخداماً:**", report['commands'])):
+            if rows:
+                message += f"\n{title}\n"
+                for name, events in rows:
+                    message += f"   • `{name}`: {events}\n"
+        message += f"\n🕒 يتم تحديث البيانات كل {int(analytics.ROLLUP_INTERVAL // 60)} دقائق"
+        await update.callback_query.edit_message_text(message, reply_markup=keyboards.ANALYTICS, parse_mode='Markdown')
 
     async def user_details(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user details"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        users = self.get_all_users()
+        users = await self.get_recent_users(10)  # عرض أول 10 مستخدمين فقط
         if not users:
             await update.callback_query.edit_message_text("📭 لا توجد بيانات مستخدمين")
             return
         
         message = "👥 **تفاصيل المستخدمين:**\n\n"
-        for i, user in enumerate(users[:10], 1):  # عرض أول 10 مستخدمين فقط
+        for i, user in enumerate(users, 1):
             message += f"{i}. {user['first_name'] or 'بدون اسم'} ({user['user_id']})\n"
             message += f"   الاستخدام: {user['usage_count']} مرة\n"
             message += f"   أول استخدام: {user['first_seen'][:16]}\n"
             message += f"   آخر استخدام: {user['last_seen'][:16]}\n\n"
         
-        if len(users) > 10:
-            message += f"📝 وإجمالي {len(users)} مستخدم"
+        users_count = await self.count_users()
+        if users_count > 10:
+            message += f"📝 وإجمالي {users_count} مستخدم"
         
-        keyboard = [
-            [InlineKeyboardButton("🔙 رجوع للإحصائيات", callback_data="admin_stats")],
-            [InlineKeyboardButton("🔙 لوحة الأدمن", callback_data="admin_main")]
-        ]
-        await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text(message, reply_markup=keyboards.USER_DETAILS, parse_mode='Markdown')
 
     # Helper functions for queries
     async def start_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        keyboard = [
-            [InlineKeyboardButton("⚙️ إعدادات الراوتر", callback_data="router_settings")],
-            [InlineKeyboardButton("💰 الأسعار والعروض", callback_data="prices_offers")],
-            [InlineKeyboardButton("❓ الأسئلة الشائعة", callback_data="faq")],
-            [InlineKeyboardButton("📞 اتصل بنا", callback_data="contact")],
-            [InlineKeyboardButton("🔗 مشاركة البوت", callback_data="share_bot")]
-        ]
-        
-        if self.is_admin(user.id):
-            keyboard.append([InlineKeyboardButton("🛠️ لوحة الأدمن", callback_data="admin_main")])
-        
-        welcome_text = self.get_bot_text('welcome')
-        await update.callback_query.edit_message_text(welcome_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        welcome_text = await self.get_bot_text('welcome')
+        await update.callback_query.edit_message_text(welcome_text, reply_markup=keyboards.main_menu(context.is_admin), parse_mode='Markdown')
 
     async def admin_panel_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Admin panel from query"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("📝 إدارة النصوص", callback_data="admin_texts")],
-            [InlineKeyboardButton("🖼️ إدارة الصور", callback_data="admin_images")],
-            [InlineKeyboardButton("📁 إدارة الملفات", callback_data="admin_router_files")],
-            [InlineKeyboardButton("💰 إدارة الباقات", callback_data="admin_packages")],
-            [InlineKeyboardButton("❓ إدارة الأسئلة", callback_data="admin_faq")],
-            [InlineKeyboardButton("👥 إدارة الأدمن", callback_data="admin_management")],
-            [InlineKeyboardButton("📊 الإحصائيات", callback_data="admin_stats")],
-            [InlineKeyboardButton("🔧 الصيانة", callback_data="admin_maintenance")],
-            [InlineKeyboardButton("📢 البث", callback_data="admin_broadcast")],
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        await update.callback_query.edit_message_text("🛠️ **لوحة تحكم الأدمن**\n\nاختر القسم الذي تريد إدارته:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        await update.callback_query.edit_message_text("🛠️ **لوحة تحكم الأدمن**\n\nاختر القسم الذي تريد إدارته:", reply_markup=keyboards.ADMIN_PANEL, parse_mode='Markdown')
 
     async def router_settings_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Router settings from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        keyboard = [
-            [InlineKeyboardButton("📶 ADSL", callback_data="router_adsl")],
-            [InlineKeyboardButton("🌐 FTTH", callback_data="router_ftth")],
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        text = self.get_bot_text('router_settings')
-        await update.callback_query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        text = await self.get_bot_text('router_settings')
+        await update.callback_query.edit_message_text(text, reply_markup=keyboards.ROUTER_SETTINGS, parse_mode='Markdown')
 
     async def show_prices_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show prices from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        packages = self.get_packages_from_db()
-        if not packages:
-            await update.callback_query.edit_message_text("📭 لا توجد باقات متاحة حالياً")
-            return
-        
-        packages_image = self.get_bot_image('packages')
-        if packages_image:
-            await update.callback_query.message.reply_photo(photo=packages_image, caption="💰 **باقاتنا المتاحة**", parse_mode='Markdown')
-        else:
-            await update.callback_query.message.reply_text("💰 **باقاتنا المتاحة**", parse_mode='Markdown')
-        
-        for package in packages:
-            features_text = '\n'.join([f'• {feature}' for feature in package['features']])
-            package_text = f"**{package['name']}**\n💰 السعر: {package['price']}\n⚡ السرعة: {package['speed']}\n\n✨ المميزات:\n{features_text}"
-            await update.callback_query.message.reply_text(package_text, parse_mode='Markdown')
-        
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        await update.callback_query.message.reply_text("اختر الخطوة التالية:", reply_markup=InlineKeyboardMarkup(keyboard))
+        await self.send_catalog(update, 'prices')
 
     async def show_faq_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show FAQ from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        faqs = self.get_faq_from_db()
-        if not faqs:
-            await update.callback_query.edit_message_text("📭 لا توجد أسئلة شائعة حالياً")
+        await self.send_catalog(update, 'faq')
+
+    async def compile_prices(self):
+        return catalog.compile_packages(await self.get_packages_from_db(), PACKAGES_PER_PAGE)
+
+    async def compile_faq(self):
+        return catalog.compile_faq(await self.get_faq_from_db(), FAQ_PER_PAGE)
+
+    async def render_catalog_page(self, kind, page):
+        """One pre-rendered page of the packages ('prices') or FAQ ('faq') catalog.
+        Returns (text, reply_markup), or None when the catalog is empty."""
+        return (await self.catalogs.get(kind)).page(page)
+
+    async def send_catalog(self, update: Update, kind):
+        """Show the first catalog page as a single message (plus the section image, if set)"""
+        empty_text = "📭 لا توجد باقات متاحة حالياً" if kind == 'prices' else "📭 لا توجد أسئلة شائعة حالياً"
+        image = await self.get_bot_image('packages' if kind == 'prices' else 'faq')
+        rendered = await self.render_catalog_page(kind, 0)
+        query = update.callback_query
+
+        if not rendered:
+            if query:
+                await query.edit_message_text(empty_text)
+            else:
+                await update.message.reply_text(empty_text)
             return
-        
-        faq_image = self.get_bot_image('faq')
-        if faq_image:
-            await update.callback_query.message.reply_photo(photo=faq_image, caption="❓ **الأسئلة الشائعة**", parse_mode='Markdown')
+
+        text, reply_markup = rendered
+        message = query.message if query else update.message
+        if image:
+            await message.reply_photo(photo=image)
+        if query and not image and not query.message.photo:
+            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
         else:
-            await update.callback_query.message.reply_text("❓ **الأسئلة الشائعة**", parse_mode='Markdown')
-        
-        for faq in faqs:
-            await update.callback_query.message.reply_text(f"❓ **{faq['question']}**\n\n✅ {faq['answer']}", parse_mode='Markdown')
-        
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        await update.callback_query.message.reply_text("اختر الخطوة التالية:", reply_markup=InlineKeyboardMarkup(keyboard))
+            await message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+    async def show_catalog_page(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind, page):
+        """Move between catalog pages by editing the message in place"""
+        rendered = await self.render_catalog_page(kind, page)
+        if not rendered:
+            await update.callback_query.edit_message_text("📭 لا توجد عناصر حالياً")
+            return
+        text, reply_markup = rendered
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
     async def show_contact_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show contact from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        contact_info = self.get_bot_text('contact')
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        contact_info = await self.get_bot_text('contact')
+        reply_markup = keyboards.HOME
         await update.callback_query.edit_message_text(contact_info, reply_markup=reply_markup, parse_mode='Markdown')
 
     async def share_bot_from_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Share bot from query"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        bot_info = await context.bot.get_me()
-        bot_username = bot_info.username
-        share_text = f"🤖 **بوت الخدمات المتكامل**\n\n🔗 رابط البوت: https://t.me/{bot_username}\n\n✅ خدماتنا:\n• ⚙️ إعدادات الراوتر\n• 💰 باقات الإنترنت\n• ❓ دعم فني\n• 📞 خدمة عملاء"
-        
-        keyboard = [
-            [InlineKeyboardButton("🔗 مشاركة الرابط", url=f"https://t.me/share/url?url=https://t.me/{bot_username}")],
-            [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.callback_query.edit_message_text(share_text, reply_markup=reply_markup, parse_mode='Markdown')
+        await update.callback_query.edit_message_text(self.share_text, reply_markup=self.share_markup, parse_mode='Markdown')
 
     async def show_router_files(self, update: Update, context: ContextTypes.DEFAULT_TYPE, router_type):
         """Show router files"""
-        # Check maintenance mode
-        if self.maintenance_mode and not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.edit_message_text(" **البوت تحت الصيانة**")
-            return
-            
-        user = update.callback_query.from_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
-        router_files = self.get_router_files(router_type)
+        router_files = await self.get_router_files(router_type)
         if router_files:
-            for file_info in router_files:
-                try:
-                    await update.callback_query.message.reply_document(
-                        document=file_info['file_id'],
-                        caption=f"📁 **{file_info['router_name']}**\n\n{file_info['description']}",
-                        parse_mode='Markdown'
-                    )
-                except Exception as e:
-                    await update.callback_query.message.reply_text(f"📁 **{file_info['router_name']}**\n\n{file_info['description']}\n\n❌ تعذر إرسال الملف", parse_mode='Markdown')
+            message = update.callback_query.message
+            for i in range(0, len(router_files), MEDIA_GROUP_SIZE):
+                batch = router_files[i:i + MEDIA_GROUP_SIZE]
+                if len(batch) > 1:
+                    try:
+                        await message.reply_media_group(media=[
+                            InputMediaDocument(
+                                media=file_info['file_id'],
+                                caption=f"📁 **{file_info['router_name']}**\n\n{file_info['description']}",
+                                parse_mode='Markdown'
+                            ) for file_info in batch
+                        ])
+                        continue
+                    except Exception as e:
+                        logging.warning("Media group send failed, falling back to single documents: %s", e)
+                # Single file, or a group that was rejected: send one by one
+                for file_info in batch:
+                    await self.send_router_file(message, file_info)
         else:
             await update.callback_query.message.reply_text("⚠️ لا توجد ملفات متاحة لهذا النوع حالياً.")
         
-        keyboard = [[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]]
-        await update.callback_query.message.reply_text("اختر الخطوة التالية:", reply_markup=InlineKeyboardMarkup(keyboard))
+        await update.callback_query.message.reply_text("اختر الخطوة التالية:", reply_markup=keyboards.HOME)
+
+    async def send_router_file(self, message, file_info):
+        """Send one router document, or its details if the file can't be sent"""
+        try:
+            await message.reply_document(
+                document=file_info['file_id'],
+                caption=f"📁 **{file_info['router_name']}**\n\n{file_info['description']}",
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            await message.reply_text(f"📁 **{file_info['router_name']}**\n\n{file_info['description']}\n\n❌ تعذر إرسال الملف", parse_mode='Markdown')
 
     # Delete confirmation functions
     async def confirm_delete_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE, file_id):
         """Confirm file deletion"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        file_info = self.get_router_file_by_id(file_id)
+        file_info = await self.get_router_file_by_id(file_id)
         if not file_info:
             await update.callback_query.edit_message_text("❌ الملف غير موجود")
             return
@@ -1237,11 +1113,11 @@ class TelecomBot:
 
     async def confirm_delete_package(self, update: Update, context: ContextTypes.DEFAULT_TYPE, package_id):
         """Confirm package deletion"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        package = self.get_package_by_id(package_id)
+        package = await self.get_package_by_id(package_id)
         if not package:
             await update.callback_query.edit_message_text("❌ الباقة غير موجودة")
             return
@@ -1254,11 +1130,11 @@ class TelecomBot:
 
     async def confirm_delete_faq(self, update: Update, context: ContextTypes.DEFAULT_TYPE, faq_id):
         """Confirm FAQ deletion"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        faq = self.get_faq_by_id(faq_id)
+        faq = await self.get_faq_by_id(faq_id)
         if not faq:
             await update.callback_query.edit_message_text("❌ السؤال غير موجود")
             return
@@ -1271,11 +1147,11 @@ class TelecomBot:
 
     async def confirm_delete_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE, admin_id):
         """Confirm admin deletion"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
-        admin = self.get_admin_by_id(admin_id)
+        admin = await self.get_admin_by_id(admin_id)
         if not admin:
             await update.callback_query.edit_message_text("❌ الأدمن غير موجود")
             return
@@ -1288,34 +1164,33 @@ class TelecomBot:
 
     async def execute_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE, action: str, item_id: int):
         """Execute delete operation"""
-        if not self.is_admin(update.callback_query.from_user.id):
-            await update.callback_query.answer("⛔ ليس لديك صلاحية", show_alert=True)
+        if not context.is_admin:
+            await self.answer_query(update.callback_query, "⛔ ليس لديك صلاحية", show_alert=True)
             return
 
         try:
             if action == 'file':
-                self.delete_router_file(item_id)
+                await self.delete_router_file_from_db(item_id)
                 message = "✅ تم حذف الملف بنجاح"
                 callback = "admin_router_files"
             elif action == 'package':
-                self.delete_package(item_id)
+                await self.delete_package_from_db(item_id)
                 message = "✅ تم حذف الباقة بنجاح"
                 callback = "admin_packages"
             elif action == 'faq':
-                self.delete_faq(item_id)
+                await self.delete_faq_from_db(item_id)
                 message = "✅ تم حذف السؤال بنجاح"
                 callback = "admin_faq"
             elif action == 'admin':
-                self.delete_admin(item_id)
-                self.load_admins()
+                await self.delete_admin(item_id)
+                await self.load_admins()
                 message = "✅ تم حذف الأدمن بنجاح"
                 callback = "admin_management"
             else:
                 message = "❌ نوع الحذف غير معروف"
                 callback = "admin_main"
             
-            keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data=callback)]]
-            await update.callback_query.edit_message_text(message, reply_markup=InlineKeyboardMarkup(keyboard))
+            await update.callback_query.edit_message_text(message, reply_markup=keyboards.BACK[callback])
         except Exception as e:
             await update.callback_query.edit_message_text(f"❌ خطأ في الحذف: {str(e)}")
 
@@ -1329,43 +1204,43 @@ class TelecomBot:
         }
         
         callback = callback_map.get(action, 'admin_main')
-        await self.button_handler(update, context)
+        route, args = self.callbacks.resolve(callback)
+        await route.handler(update, context, *args)
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages"""
         user = update.effective_user
-        self.update_user_stats(user.id, user.username, user.first_name, user.last_name)
-        
         text = update.message.text
         awaiting_input = context.user_data.get('awaiting_input')
         
         if not awaiting_input:
+            await self.answer_free_text(update, text)
             return
 
         try:
             if awaiting_input == 'edit_welcome_text':
-                if not self.is_admin(user.id): return
-                self.save_bot_text('welcome', text)
+                if not context.is_admin: return
+                await self.save_bot_text('welcome', text)
                 context.user_data['awaiting_input'] = None
                 await update.message.reply_text("✅ تم تحديث نص البداية بنجاح!")
                 await self.admin_texts(update, context)
             
             elif awaiting_input == 'edit_settings_text':
-                if not self.is_admin(user.id): return
-                self.save_bot_text('router_settings', text)
+                if not context.is_admin: return
+                await self.save_bot_text('router_settings', text)
                 context.user_data['awaiting_input'] = None
                 await update.message.reply_text("✅ تم تحديث نص الإعدادات بنجاح!")
                 await self.admin_texts(update, context)
             
             elif awaiting_input == 'edit_contact_text':
-                if not self.is_admin(user.id): return
-                self.save_bot_text('contact', text)
+                if not context.is_admin: return
+                await self.save_bot_text('contact', text)
                 context.user_data['awaiting_input'] = None
                 await update.message.reply_text("✅ تم تحديث نص الاتصال بنجاح!")
                 await self.admin_texts(update, context)
             
             elif awaiting_input == 'add_router_file':
-                if not self.is_admin(user.id): return
+                if not context.is_admin: return
                 lines = text.split('\n')
                 if len(lines) >= 3:
                     context.user_data['new_router_file'] = {
@@ -1379,11 +1254,11 @@ class TelecomBot:
                     await update.message.reply_text("❌ البيانات غير مكتملة")
             
             elif awaiting_input == 'add_package':
-                if not self.is_admin(user.id): return
+                if not context.is_admin: return
                 lines = text.split('\n')
                 if len(lines) >= 4:
                     features = [f.strip() for f in lines[3].split(',')]
-                    self.add_package_to_db(lines[0].strip(), lines[1].strip(), lines[2].strip(), features)
+                    await self.add_package_to_db(lines[0].strip(), lines[1].strip(), lines[2].strip(), features)
                     context.user_data['awaiting_input'] = None
                     await update.message.reply_text("✅ تم إضافة الباقة بنجاح!")
                     await self.admin_packages(update, context)
@@ -1391,10 +1266,10 @@ class TelecomBot:
                     await update.message.reply_text("❌ البيانات غير مكتملة")
             
             elif awaiting_input == 'add_faq':
-                if not self.is_admin(user.id): return
+                if not context.is_admin: return
                 lines = text.split('\n')
                 if len(lines) >= 2:
-                    self.add_faq_to_db(lines[0].strip(), lines[1].strip())
+                    await self.add_faq_to_db(lines[0].strip(), lines[1].strip())
                     context.user_data['awaiting_input'] = None
                     await update.message.reply_text("✅ تم إضافة السؤال بنجاح!")
                     await self.admin_faq(update, context)
@@ -1402,12 +1277,12 @@ class TelecomBot:
                     await update.message.reply_text("❌ يرجى إرسال السؤال والجواب في سطرين منفصلين.")
             
             elif awaiting_input == 'add_admin':
-                if not self.is_admin(user.id): return
+                if not context.is_admin: return
                 try:
                     new_admin_id = int(text.strip())
                     if not self.is_admin(new_admin_id):
-                        self.add_admin_to_db(new_admin_id, user.username)
-                        self.load_admins()
+                        await self.add_admin_to_db(new_admin_id, user.username)
+                        await self.load_admins()
                         await update.message.reply_text(f"✅ تم إضافة الأدمن: `{new_admin_id}`", parse_mode='Markdown')
                         await self.admin_management(update, context)
                     else:
@@ -1417,48 +1292,30 @@ class TelecomBot:
                 context.user_data['awaiting_input'] = None
             
             elif awaiting_input == 'send_broadcast':
-                if not self.is_admin(user.id): return
-                users = self.get_all_users()
-                
-                if not users:
-                    await update.message.reply_text("📭 لم يتم العثور على مستخدمين في قاعدة البيانات.")
-                    context.user_data['awaiting_input'] = None
-                    return
-
-                await update.message.reply_text(f"📤 بدء البث إلى {len(users)} مستخدم...")
-                
-                success_count = 0
-                fail_count = 0
-                
-                for user_data in users:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=user_data['user_id'],
-                            text=f"📢 **إعلان من الأدمن**\n\n{text}",
-                            parse_mode='Markdown'
-                        )
-                        success_count += 1
-                        await asyncio.sleep(0.1)  # Rate limiting
-                    except Exception as e:
-                        fail_count += 1
-                        continue
-
-                await update.message.reply_text(
-                    f"📊 **اكتمل البث**\n\n"
-                    f"✅ ناجح: {success_count}\n"
-                    f"❌ فاشل: {fail_count}\n"
-                    f"📝 الإجمالي: {len(users)}"
-                )
+                if not context.is_admin: return
                 context.user_data['awaiting_input'] = None
+                await self.run_broadcast(update.message, f"📢 **إعلان من الأدمن**\n\n{text}")
         
         except Exception as e:
             await update.message.reply_text(f"❌ حدث خطأ: {str(e)}")
             context.user_data['awaiting_input'] = None
 
+    async def answer_free_text(self, update: Update, text):
+        """Answer a typed question with the best matching FAQ entries"""
+        matches = await self.search_faq(text)
+        if not matches:
+            await update.message.reply_text("🤔 لم أجد إجابة لسؤالك.\n\nتصفح الأسئلة الشائعة أو تواصل معنا.", reply_markup=keyboards.FAQ_SEARCH)
+            return
+
+        best = matches[0]
+        message = f"❓ **{best['question']}**\n\n✅ {best['answer']}"
+        if len(matches) > 1:
+            message += "\n\n🔎 **أسئلة مشابهة:**\n" + '\n'.join(f"• {faq['question']}" for faq in matches[1:])
+        await update.message.reply_text(message, reply_markup=keyboards.FAQ_SEARCH, parse_mode='Markdown')
+
     async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle documents"""
-        user = update.effective_user
-        if not self.is_admin(user.id): return
+        if not context.is_admin: return
 
         if context.user_data.get('awaiting_input') == 'awaiting_router_file':
             document = update.message.document
@@ -1466,7 +1323,7 @@ class TelecomBot:
             file_name = document.file_name
             
             router_data = context.user_data['new_router_file']
-            self.add_router_file_to_db(router_data['type'], router_data['router_name'], file_id, router_data['description'], file_name)
+            await self.add_router_file_to_db(router_data['type'], router_data['router_name'], file_id, router_data['description'], file_name)
             
             context.user_data['awaiting_input'] = None
             context.user_data.pop('new_router_file', None)
@@ -1476,287 +1333,188 @@ class TelecomBot:
 
     async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle photos"""
-        user = update.effective_user
-        if not self.is_admin(user.id): return
+        if not context.is_admin: return
 
         awaiting_input = context.user_data.get('awaiting_input')
         photo = update.message.photo[-1]
 
         if awaiting_input == 'change_welcome_image':
-            self.save_bot_image('welcome', photo.file_id)
+            await self.save_bot_image('welcome', photo.file_id)
             context.user_data['awaiting_input'] = None
             await update.message.reply_text("✅ تم تغيير صورة البداية بنجاح!")
             await self.admin_images(update, context)
         
         elif awaiting_input == 'change_packages_image':
-            self.save_bot_image('packages', photo.file_id)
+            await self.save_bot_image('packages', photo.file_id)
             context.user_data['awaiting_input'] = None
             await update.message.reply_text("✅ تم تغيير صورة الباقات بنجاح!")
             await self.admin_images(update, context)
         
         elif awaiting_input == 'change_faq_image':
-            self.save_bot_image('faq', photo.file_id)
+            await self.save_bot_image('faq', photo.file_id)
             context.user_data['awaiting_input'] = None
             await update.message.reply_text("✅ تم تغيير صورة الأسئلة بنجاح!")
             await self.admin_images(update, context)
 
     # Database functions
-    def get_bot_text(self, text_type):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT content FROM bot_texts WHERE type = ?", (text_type,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else "النص غير محدد"
+    async def get_bot_text(self, text_type):
+        content = await self.content.get_text(text_type)
+        return content if content is not None else "النص غير محدد"
     
-    def save_bot_text(self, text_type, content):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO bot_texts (type, content) VALUES (?, ?)', (text_type, content))
-        conn.commit()
-        conn.close()
+    async def save_bot_text(self, text_type, content):
+        await self.repo.save_text(text_type, content)
+        self.content.invalidate_texts()
     
-    def get_bot_image(self, image_type):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT file_id FROM bot_images WHERE type = ?", (image_type,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+    async def get_bot_image(self, image_type):
+        return await self.content.get_image(image_type)
     
-    def save_bot_image(self, image_type, file_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO bot_images (type, file_id) VALUES (?, ?)', (image_type, file_id))
-        conn.commit()
-        conn.close()
+    async def save_bot_image(self, image_type, file_id):
+        await self.repo.save_image(image_type, file_id)
+        self.content.invalidate_images()
     
-    def delete_bot_image(self, image_type):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM bot_images WHERE type = ?", (image_type,))
-        conn.commit()
-        conn.close()
+    async def delete_bot_image(self, image_type):
+        await self.repo.delete_image(image_type)
+        self.content.invalidate_images()
 
     # this for give option to users
         
 
-    def get_router_files(self, router_type):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM router_files WHERE type = ?", (router_type,))
-        files = cursor.fetchall()
-        conn.close()
-        return [{'id': f[0], 'type': f[1], 'router_name': f[2], 'file_id': f[3], 'description': f[4], 'file_name': f[5]} for f in files]
+    async def get_router_files(self, router_type):
+        return await self.repo.get_router_files(router_type)
     
-    def get_all_router_files(self):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM router_files")
-        files = cursor.fetchall()
-        conn.close()
-        return [{'id': f[0], 'type': f[1], 'router_name': f[2], 'file_id': f[3], 'description': f[4], 'file_name': f[5]} for f in files]
+    async def get_all_router_files(self):
+        return await self.repo.get_all_router_files()
     
-    def get_router_file_by_id(self, file_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM router_files WHERE id = ?", (file_id,))
-        file = cursor.fetchone()
-        conn.close()
-        if file:
-            return {'id': file[0], 'type': file[1], 'router_name': file[2], 'file_id': file[3], 'description': file[4], 'file_name': file[5]}
-        return None
+    async def get_router_file_by_id(self, file_id):
+        return await self.repo.get_router_file(file_id)
     
     #  this can make code more cleaning
 
 
-    def add_router_file_to_db(self, file_type, router_name, file_id, description, file_name):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO router_files (type, router_name, file_id, description, file_name) VALUES (?, ?, ?, ?, ?)', (file_type, router_name, file_id, description, file_name))
-        conn.commit()
-        conn.close()
+    async def add_router_file_to_db(self, file_type, router_name, file_id, description, file_name):
+        await self.repo.add_router_file(file_type, router_name, file_id, description, file_name)
+    
+    async def delete_router_file_from_db(self, file_id):
+        await self.repo.delete_router_file(file_id)
     
-    def delete_router_file(self, file_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM router_files WHERE id = ?", (file_id,))
-        conn.commit()
-        conn.close()
+    async def get_faq_from_db(self):
+        return await self.repo.get_faqs()
     
-    def get_faq_from_db(self):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM faq")
-        faqs = cursor.fetchall()
-        conn.close()
-        return [{'id': f[0], 'question': f[1], 'answer': f[2]} for f in faqs]
+    async def get_faq_by_id(self, faq_id):
+        return await self.repo.get_faq(faq_id)
     
-    def get_faq_by_id(self, faq_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM faq WHERE id = ?", (faq_id,))
-        faq = cursor.fetchone()
-        conn.close()
-        if faq:
-            return {'id': faq[0], 'question': faq[1], 'answer': faq[2]}
-        return None
+    async def add_faq_to_db(self, question, answer):
+        await self.repo.add_faq(question, answer)
+        self.catalogs.invalidate('faq')
     
-    def add_faq_to_db(self, question, answer):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO faq (question, answer) VALUES (?, ?)', (question, answer))
-        conn.commit()
-        conn.close()
+    async def delete_faq_from_db(self, faq_id):
+        await self.repo.delete_faq(faq_id)
+        self.catalogs.invalidate('faq')
     
-    def delete_faq(self, faq_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM faq WHERE id = ?", (faq_id,))
-        conn.commit()
-        conn.close()
+    async def search_faq(self, text, limit=3):
+        """Ranked FAQ entries matching free text"""
+        return await self.repo.search_faq(text, limit)
     
-    def get_packages_from_db(self):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM packages")
-        packages = cursor.fetchall()
-        conn.close()
-        return [{'id': p[0], 'name': p[1], 'price': p[2], 'speed': p[3], 'features': json.loads(p[4]) if p[4] else []} for p in packages]
+    async def get_packages_from_db(self):
+        return await self.repo.get_packages()
     
-    def get_package_by_id(self, package_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM packages WHERE id = ?", (package_id,))
-        package = cursor.fetchone()
-        conn.close()
-        if package:
-            return {'id': package[0], 'name': package[1], 'price': package[2], 'speed': package[3], 'features': json.loads(package[4]) if package[4] else []}
-        return None
+    async def get_package_by_id(self, package_id):
+        return await self.repo.get_package(package_id)
     
-    def add_package_to_db(self, name, price, speed, features):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        features_json = json.dumps(features)
-        cursor.execute('INSERT INTO packages (name, price, speed, features) VALUES (?, ?, ?, ?)', (name, price, speed, features_json))
-        conn.commit()
-        conn.close()
+    async def add_package_to_db(self, name, price, speed, features):
+        await self.repo.add_package(name, price, speed, features)
+        self.catalogs.invalidate('prices')
     
-    def delete_package(self, package_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM packages WHERE id = ?", (package_id,))
-        conn.commit()
-        conn.close()
+    async def delete_package_from_db(self, package_id):
+        await self.repo.delete_package(package_id)
+        self.catalogs.invalidate('prices')
     
-    def get_admins_from_db(self):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM admins")
-        admins = cursor.fetchall()
-        conn.close()
-        return [{'user_id': a[0], 'username': a[1]} for a in admins]
+    async def get_admins_from_db(self):
+        return await self.repo.get_admins()
     
-    def get_admin_by_id(self, admin_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM admins WHERE user_id = ?", (admin_id,))
-        admin = cursor.fetchone()
-        conn.close()
-        if admin:
-            return {'user_id': admin[0], 'username': admin[1]}
-        return None
+    async def get_admin_by_id(self, admin_id):
+        return await self.repo.get_admin(admin_id)
     
-    def add_admin_to_db(self, user_id, username):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO admins (user_id, username) VALUES (?, ?)', (user_id, username))
-        conn.commit()
-        conn.close()
+    async def add_admin_to_db(self, user_id, username):
+        await self.repo.add_admin(user_id, username)
     
      
     #    start bot
 
-    def delete_admin(self, user_id):
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM admins WHERE user_id = ?", (user_id,))
-        conn.commit()
-        conn.close()
+    async def delete_admin(self, user_id):
+        await self.repo.delete_admin(user_id)
     
-    def get_user_stats(self):
+    async def get_stats_counters(self):
+        """Read stats_counters, served from a short-lived snapshot"""
+        now = time.monotonic()
+        if self._stats_snapshot is None or now - self._stats_snapshot_at > STATS_SNAPSHOT_TTL:
+            self._stats_snapshot = await self.repo.stats_counters()
+            self._stats_snapshot_at = now
+        return self._stats_snapshot
+
+    async def get_user_stats(self):
         """Get user statistics"""
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM user_stats")
-        total_users = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT SUM(usage_count) FROM user_stats")
-        total_usage = cursor.fetchone()[0] or 0
-        
+        counters = await self.get_stats_counters()
+        total_users = counters.get('total_users', 0)
+        total_usage = counters.get('total_usage', 0)
         avg_usage = total_usage / total_users if total_users > 0 else 0
         
-        conn.close()
-        
         return {
             'total_users': total_users,
             'total_usage': total_usage,
             'avg_usage': round(avg_usage, 2)
         }
     
-    def get_all_users(self):
-        """Get all users"""
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM user_stats ORDER BY last_seen DESC")
-        users = cursor.fetchall()
-        conn.close()
-        
-        return [{
-            'user_id': u[0],
-            'username': u[1],
-            'first_name': u[2],
-            'last_name': u[3],
-            'usage_count': u[4],
-            'first_seen': u[5],
-            'last_seen': u[6]
-        } for u in users]
+    async def get_recent_users(self, limit):
+        """Get the most recently active users"""
+        return await self.repo.get_recent_users(limit)
+    
+    async def count_users(self):
+        """Count users without loading them"""
+        return await self.repo.count_users()
     
-    def get_bot_stats(self):
+    async def get_bot_stats(self):
         """Get bot statistics"""
-        conn = sqlite3.connect('bot_database.db', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM router_files WHERE type = 'adsl'")
-        adsl_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM router_files WHERE type = 'ftth'")
-        ftth_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM faq")
-        total_faq = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM packages")
-        total_packages = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM admins")
-        total_admins = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM bot_images")
-        total_images = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM bot_texts")
-        total_texts = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            'adsl_files': adsl_files, 'ftth_files': ftth_files,
-            'total_files': adsl_files + ftth_files, 'total_packages': total_packages,
-            'total_faq': total_faq, 'total_admins': total_admins,
-            'total_images': total_images, 'total_texts': total_texts
-        }
+        counters = await self.get_stats_counters()
+        adsl_files = counters.get('files_adsl', 0)
+        ftth_files = counters.get('files_ftth', 0)
+        stats = {name: counters.get(name, 0) for name in stats_counters.ROW_COUNTERS}
+        stats.update({'adsl_files': adsl_files, 'ftth_files': ftth_files, 'total_files': adsl_files + ftth_files})
+        return stats
+
+def run_shard_worker(index, inbox):
+    """Entry point of a worker process in sharded mode"""
+    # The front process handles Ctrl+C and stops the workers through their inboxes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bot = TelecomBot(BOT_TOKEN)
+    bot.broadcast_jobs.runner = index == 0
+    asyncio.run(bot.run_worker(inbox))
+
+
+async def run_sharded(workers):
+    """Front process: receive updates and route them to the worker processes"""
+    router = ShardRouter(run_shard_worker, workers)
+    router.start()
+    webhook = None
+    try:
+        async with Bot(BOT_TOKEN) as bot:
+            if BOT_MODE == 'webhook':
+                webhook = WebhookServer(bot, router.put_update, WEBHOOK_SECRET, path=WEBHOOK_PATH)
+                await webhook.start(WEBHOOK_LISTEN, WEBHOOK_PORT)
+                if WEBHOOK_URL:
+                    await bot.set_webhook(
+                        url=WEBHOOK_URL,
+                        secret_token=WEBHOOK_SECRET,
+                        allowed_updates=Update.ALL_TYPES
+                    )
+                await asyncio.Event().wait()
+            else:
+                await bot.delete_webhook()
+                await router.poll(bot)
+    finally:
+        if webhook:
+            await webhook.stop()
+        await asyncio.get_running_loop().run_in_executor(None, router.stop)
 
 def main():
     print("🚀 بدء تشغيل البوت...")
@@ -1764,8 +1522,16 @@ def main():
     if len(BOT_TOKEN) < 20:
         print("❌ يبدو أن التوكن غير صحيح!")
         return
+
+    if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+        print("❌ وضع webhook يتطلب تعيين WEBHOOK_SECRET")
+        return
     
     try:
+        if BOT_WORKERS > 1:
+            print(f"✅ البوت يعمل بنجاح! ({BOT_WORKERS} عمليات)")
+            asyncio.run(run_sharded(BOT_WORKERS))
+            return
         bot = TelecomBot(BOT_TOKEN)
         print("✅ البوت يعمل بنجاح!")
         print("📱 اذهب إلى تلغرام وجرب الأوامر:")
@@ -1773,7 +1539,10 @@ def main():
         print("   /admin - لوحة التحكم (للمسؤولين فقط)")
         print("   /maintenance - تحكم في الصيانة (للمسؤولين فقط)") 
         print("   /broadcast - إرسال رسالة لجميع المستخدمين (للمسؤولين فقط)")
-        bot.application.run_polling()
+        if BOT_MODE == 'webhook':
+            asyncio.run(bot.run_webhook())
+        else:
+            bot.application.run_polling()
     except KeyboardInterrupt:
         print("\n🛑 إيقاف البوت...")
     except Exception as e:
@@ -0,0 +1,131 @@
+"""Persistence of context.user_data in the local SQLite database.
+
+Multi-step admin flows (awaiting_input, new_router_file) keep their state
+in user_data, so it must survive a restart. Unlike PTB's pickle persistence
+this never serialises the whole state: each user is one JSON row in
+persisted_user_data, loaded the first time one of their updates is
+processed and written only when it actually changed. Rows that changed
+within one persistence run are written together as a single batch.
+
+Only user_data is stored; chat_data, bot_data, callback data and
+conversations are not used by the bot.
+"""
+import asyncio
+import json
+
+from telegram.ext import BasePersistence, PersistenceInput # type: ignore
+
+# Seconds between PTB's persistence runs (a crash loses at most this much)
+UPDATE_INTERVAL = 5
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, sort_keys=True) if data else None
+
+
+class SQLitePersistence(BasePersistence):
+    def __init__(self, db, update_interval=UPDATE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.db = db
+        self._stored = {}  # user_id -> JSON as last loaded/written (None: no row)
+        self._dirty = {}   # user_id -> JSON (None: delete) waiting for the next batch
+        self._batch = None
+
+    async def get_user_data(self):
+        # Nothing up front: users are loaded lazily by refresh_user_data
+        return {}
+
+    async def refresh_user_data(self, user_id, user_data):
+        """Called before every update of this user; loads the stored state the first time"""
+        if user_id in self._stored:
+            return
+        row = await self.db.fetchone("SELECT data FROM persisted_user_data WHERE user_id = ?", (user_id,))
+        if user_id in self._stored:
+            return  # another update of the same user loaded it meanwhile
+        self._stored[user_id] = row[0] if row else None
+        if row:
+            # Keys set before the load (none in practice) win over stored ones
+            user_data.update({key: value for key, value in json.loads(row[0]).items() if key not in user_data})
+
+    async def update_user_data(self, user_id, data):
+        payload = _dump(data)
+        if user_id in self._stored and self._stored[user_id] == payload:
+            return
+        self._stored[user_id] = payload
+        self._dirty[user_id] = payload
+        await self._write_batch()
+
+    async def drop_user_data(self, user_id):
+        self._stored[user_id] = None
+        self._dirty[user_id] = None
+        await self._write_batch()
+
+    async def _write_batch(self):
+        # PTB hands every user of a run over concurrently: the first call
+        # schedules the batch, the rest join it before it starts
+        if self._batch is None:
+            self._batch = asyncio.get_running_loop().create_task(self._write())
+        await asyncio.shield(self._batch)
+
+    async def _write(self):
+        await asyncio.sleep(0)
+        batch, self._dirty = self._dirty, {}
+        self._batch = None
+        upserts = [(user_id, payload) for user_id, payload in batch.items() if payload is not None]
+        deletes = [(user_id,) for user_id, payload in batch.items() if payload is None]
+
+        def _save(conn):
+            conn.executemany(
+                "INSERT INTO persisted_user_data (user_id, data) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = CURRENT_TIMESTAMP",
+                upserts
+            )
+            conn.executemany("DELETE FROM persisted_user_data WHERE user_id = ?", deletes)
+        try:
+            await self.db.write(_save)
+        except Exception:
+            # Retried with the next batch, unless a newer state is already waiting
+            for user_id, payload in batch.items():
+                self._dirty.setdefault(user_id, payload)
+            raise
+
+    async def flush(self):
+        if self._dirty or self._batch is not None:
+            await self._write_batch()
+
+    # Data the bot doesn't persist
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
@@ -0,0 +1,105 @@
+"""Multi-process update processing (BOT_WORKERS > 1).
+
+A front process receives the updates (long polling or the webhook server)
+and routes each one by user id to one of N worker processes, each running
+the full bot with its own event loop. A user always lands on the same
+worker, whose Application handles updates one at a time in arrival order,
+so per-user ordering (and context.user_data flows) is kept while different
+users are served on different cores.
+
+Workers share the database and keep their caches current through the
+change feed. Broadcasts are sent by worker 0 only: a job created on another
+worker is queued in broadcast_jobs and picked up there, so all of them
+share one token bucket and stay under Telegram's global rate limit. A
+cancel from any worker stops the job through its row.
+
+Limits: every worker has its own SQLite writer thread, so writes (user
+stats, analytics, user_data, broadcast progress) from N workers contend
+for SQLite's single write lock again; each worker still group-commits, and
+waits up to the 30 s busy timeout. Sharding spreads handler CPU, not write
+throughput. STORAGE_BACKEND=postgres moves content and user stats off the
+SQLite file, but broadcasts, analytics and user_data stay local.
+"""
+import asyncio
+import logging
+import multiprocessing
+
+from telegram import Update # type: ignore
+from telegram.error import NetworkError, RetryAfter # type: ignore
+
+POLL_TIMEOUT = 30
+# Delay before retrying getUpdates after a network error
+POLL_RETRY_DELAY = 3.0
+
+logger = logging.getLogger(__name__)
+
+
+class ShardRouter:
+    """Owns the worker processes and their inboxes.
+
+    target(index, inbox) is the worker entry point; it must be a module-level
+    function so it can be started with the 'spawn' method on every platform.
+    Inbox items are update dicts, None asks the worker to stop.
+    """
+
+    def __init__(self, target, workers):
+        self.target = target
+        self.workers = workers
+        self._context = multiprocessing.get_context('spawn')
+        self._inboxes = [self._context.Queue() for _ in range(workers)]
+        self._processes = [None] * workers
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=self.target, args=(index, self._inboxes[index]), name=f'bot-worker-{index}', daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info("Started %d bot workers", self.workers)
+
+    def shard(self, update):
+        user = update.effective_user
+        return user.id % self.workers if user else 0
+
+    def route(self, update):
+        """Queue an update on its user's worker (restarting the worker if it died)"""
+        index = self.shard(update)
+        if not self._processes[index].is_alive():
+            logger.error("bot worker %d exited with %s, restarting", index, self._processes[index].exitcode)
+            self._spawn(index)
+        self._inboxes[index].put(update.to_dict())
+
+    async def put_update(self, update):
+        """WebhookServer sink; callback queries are answered by the workers"""
+        self.route(update)
+
+    async def poll(self, bot):
+        """Long-poll getUpdates forever, routing every update"""
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except NetworkError:
+                logger.warning("getUpdates failed, retrying", exc_info=True)
+                await asyncio.sleep(POLL_RETRY_DELAY)
+                continue
+            for update in updates:
+                self.route(update)
+                offset = update.update_id + 1
+
+    def stop(self, timeout=30):
+        """Ask every worker to finish its queue and shut down, then wait for them"""
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
@@ -0,0 +1,23 @@
+"""Row counters for the admin statistics screen.
+
+stats_counters holds one row per statistic, kept current by triggers on the
+counted tables (created by migration 5), so the stats screen is a single
+read of a tiny table instead of a COUNT(*)/SUM() over each table. Write
+paths must use plain
+INSERT/UPDATE/DELETE or upserts: INSERT OR REPLACE removes the old row
+without firing DELETE triggers and would skew the counts.
+"""
+
+# counter -> table whose rows it counts
+ROW_COUNTERS = {
+    'total_faq': 'faq',
+    'total_packages': 'packages',
+    'total_admins': 'admins',
+    'total_images': 'bot_images',
+    'total_texts': 'bot_texts',
+    'total_users': 'user_stats',
+}
+
+
+def read(conn):
+    return dict(conn.execute("SELECT name, value FROM stats_counters"))
@@ -0,0 +1,346 @@
+"""Storage backends for the bot's content and users.
+
+Repository is the interface every backend implements: texts, images,
+router files, FAQ, packages, admins, settings and user stats. The bot only
+talks to its repository; which one is used is chosen by STORAGE_BACKEND
+(see open_repository). SQLiteRepository keeps everything in the local
+database file, PostgresRepository (storage_postgres.py) in a shared
+PostgreSQL server.
+
+Bot-local operational state (broadcast jobs, usage analytics) always stays
+in the local SQLite database.
+"""
+import asyncio
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+
+import faq_search
+import migrations
+import stats_counters
+
+
+def router_file_row(row):
+    return {'id': row[0], 'type': row[1], 'router_name': row[2], 'file_id': row[3], 'description': row[4], 'file_name': row[5]}
+
+
+def faq_row(row):
+    return {'id': row[0], 'question': row[1], 'answer': row[2]}
+
+
+def package_row(row):
+    return {'id': row[0], 'name': row[1], 'price': row[2], 'speed': row[3], 'features': json.loads(row[4]) if row[4] else []}
+
+
+def admin_row(row):
+    return {'user_id': row[0], 'username': row[1]}
+
+
+def user_row(row):
+    return {
+        'user_id': row[0],
+        'username': row[1],
+        'first_name': row[2],
+        'last_name': row[3],
+        'usage_count': row[4],
+        'first_seen': row[5],
+        'last_seen': row[6]
+    }
+
+
+class Repository(ABC):
+    """Persistence interface of the bot. All methods are coroutines.
+    A backend missing one of the abstract methods can't be instantiated."""
+
+    async def start(self):
+        """Connect and bring the schema up to date"""
+
+    async def close(self):
+        """Release connections"""
+
+    # Texts and images: {type: value} of every row
+    @abstractmethod
+    async def get_texts(self): ...
+    @abstractmethod
+    async def save_text(self, text_type, content): ...
+    @abstractmethod
+    async def get_images(self): ...
+    @abstractmethod
+    async def save_image(self, image_type, file_id): ...
+    @abstractmethod
+    async def delete_image(self, image_type): ...
+
+    # Router files
+    @abstractmethod
+    async def get_router_files(self, router_type): ...
+    @abstractmethod
+    async def get_all_router_files(self): ...
+    @abstractmethod
+    async def get_router_file(self, file_id): ...
+    @abstractmethod
+    async def add_router_file(self, file_type, router_name, file_id, description, file_name): ...
+    @abstractmethod
+    async def delete_router_file(self, file_id): ...
+    @abstractmethod
+    async def get_router_file_hashes(self): ...
+
+    @abstractmethod
+    async def add_router_files(self, files):
+        """Insert (type, router_name, file_id, description, file_name, sha256) rows in one
+        transaction, skipping hashes already stored; returns the number inserted"""
+
+    # FAQ, including its full-text search
+    @abstractmethod
+    async def get_faqs(self): ...
+    @abstractmethod
+    async def get_faq(self, faq_id): ...
+    @abstractmethod
+    async def add_faq(self, question, answer): ...
+    @abstractmethod
+    async def delete_faq(self, faq_id): ...
+    @abstractmethod
+    async def search_faq(self, text, limit=3): ...
+
+    # Packages (features is a list)
+    @abstractmethod
+    async def get_packages(self): ...
+    @abstractmethod
+    async def get_package(self, package_id): ...
+    @abstractmethod
+    async def add_package(self, name, price, speed, features): ...
+    @abstractmethod
+    async def delete_package(self, package_id): ...
+
+    # Admins
+    @abstractmethod
+    async def get_admins(self): ...
+    @abstractmethod
+    async def get_admin(self, user_id): ...
+    @abstractmethod
+    async def add_admin(self, user_id, username): ...
+    @abstractmethod
+    async def delete_admin(self, user_id): ...
+
+    # Settings shared by every bot process (maintenance mode)
+    @abstractmethod
+    async def get_setting(self, key): ...
+    @abstractmethod
+    async def set_setting(self, key, value): ...
+
+    # Users
+    @abstractmethod
+    async def upsert_user_stats(self, rows):
+        """rows: (user_id, username, first_name, last_name, uses, first_seen, last_seen);
+        uses are added to usage_count, first_seen only applies to new users"""
+
+    @abstractmethod
+    async def get_recent_users(self, limit): ...
+    @abstractmethod
+    async def count_users(self): ...
+
+    @abstractmethod
+    def iter_user_ids(self, page_size=1000):
+        """Async iterator over every user id, in id order"""
+
+    @abstractmethod
+    async def stats_counters(self):
+        """Counters for the statistics screen, keyed like stats_counters.read()"""
+
+    @abstractmethod
+    async def content_versions(self):
+        """{domain: version} of the change feed, or None when nothing can have
+        changed since the previous call"""
+
+
+class SQLiteRepository(Repository):
+    """Repository on the local SQLite database (schema from migrations.py)"""
+
+    USER_STATS_UPSERT = '''
+        INSERT INTO user_stats
+        (user_id, username, first_name, last_name, usage_count, first_seen, last_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            username = excluded.username,
+            first_name = excluded.first_name,
+            last_name = excluded.last_name,
+            usage_count = user_stats.usage_count + excluded.usage_count,
+            last_seen = excluded.last_seen
+    '''
+
+    def __init__(self, db):
+        self.db = db
+        self._versions_conn = None
+        self._data_version = None
+
+    async def start(self):
+        # The schema is migrated synchronously at startup (migrations.migrate);
+        # this only re-adds the owner if the admin table was emptied
+        if not await self.db.fetchone("SELECT 1 FROM admins LIMIT 1"):
+            await self.db.write(migrations.ensure_default_admin)
+
+    async def close(self):
+        if self._versions_conn is not None:
+            self._versions_conn.close()
+            self._versions_conn = None
+
+    async def get_texts(self):
+        return dict(await self.db.fetchall("SELECT type, content FROM bot_texts"))
+
+    async def save_text(self, text_type, content):
+        await self.db.execute(
+            'INSERT INTO bot_texts (type, content) VALUES (?, ?) '
+            'ON CONFLICT(type) DO UPDATE SET content = excluded.content, updated_at = CURRENT_TIMESTAMP',
+            (text_type, content)
+        )
+
+    async def get_images(self):
+        return dict(await self.db.fetchall("SELECT type, file_id FROM bot_images"))
+
+    async def save_image(self, image_type, file_id):
+        await self.db.execute(
+            'INSERT INTO bot_images (type, file_id) VALUES (?, ?) '
+            'ON CONFLICT(type) DO UPDATE SET file_id = excluded.file_id',
+            (image_type, file_id)
+        )
+
+    async def delete_image(self, image_type):
+        await self.db.execute("DELETE FROM bot_images WHERE type = ?", (image_type,))
+
+    async def get_router_files(self, router_type):
+        files = await self.db.fetchall("SELECT * FROM router_files WHERE type = ?", (router_type,))
+        return [router_file_row(f) for f in files]
+
+    async def get_all_router_files(self):
+        return [router_file_row(f) for f in await self.db.fetchall("SELECT * FROM router_files")]
+
+    async def get_router_file(self, file_id):
+        file = await self.db.fetchone("SELECT * FROM router_files WHERE id = ?", (file_id,))
+        return router_file_row(file) if file else None
+
+    async def add_router_file(self, file_type, router_name, file_id, description, file_name):
+        return await self.db.execute(
+            'INSERT INTO router_files (type, router_name, file_id, description, file_name) VALUES (?, ?, ?, ?, ?)',
+            (file_type, router_name, file_id, description, file_name)
+        )
+
+    async def delete_router_file(self, file_id):
+        await self.db.execute("DELETE FROM router_files WHERE id = ?", (file_id,))
+
+    async def get_router_file_hashes(self):
+        return {h for (h,) in await self.db.fetchall("SELECT sha256 FROM router_files WHERE sha256 IS NOT NULL")}
+
+    async def add_router_files(self, files):
+        return await self.db.executemany(
+            'INSERT INTO router_files (type, router_name, file_id, description, file_name, sha256) '
+            'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(sha256) DO NOTHING',
+            files
+        )
+
+    async def get_faqs(self):
+        return [faq_row(f) for f in await self.db.fetchall("SELECT * FROM faq")]
+
+    async def get_faq(self, faq_id):
+        faq = await self.db.fetchone("SELECT * FROM faq WHERE id = ?", (faq_id,))
+        return faq_row(faq) if faq else None
+
+    async def add_faq(self, question, answer):
+        def _add(conn):
+            faq_id = conn.execute('INSERT INTO faq (question, answer) VALUES (?, ?)', (question, answer)).lastrowid
+            faq_search.index_faq(conn, faq_id, question, answer)
+            return faq_id
+        return await self.db.write(_add)
+
+    async def delete_faq(self, faq_id):
+        def _delete(conn):
+            conn.execute("DELETE FROM faq WHERE id = ?", (faq_id,))
+            faq_search.unindex_faq(conn, faq_id)
+        await self.db.write(_delete)
+
+    async def search_faq(self, text, limit=3):
+        return await self.db.run(faq_search.search, text, limit)
+
+    async def get_packages(self):
+        return [package_row(p) for p in await self.db.fetchall("SELECT * FROM packages")]
+
+    async def get_package(self, package_id):
+        package = await self.db.fetchone("SELECT * FROM packages WHERE id = ?", (package_id,))
+        return package_row(package) if package else None
+
+    async def add_package(self, name, price, speed, features):
+        return await self.db.execute(
+            'INSERT INTO packages (name, price, speed, features) VALUES (?, ?, ?, ?)',
+            (name, price, speed, json.dumps(features))
+        )
+
+    async def delete_package(self, package_id):
+        await self.db.execute("DELETE FROM packages WHERE id = ?", (package_id,))
+
+    async def get_admins(self):
+        return [admin_row(a) for a in await self.db.fetchall("SELECT * FROM admins")]
+
+    async def get_admin(self, user_id):
+        admin = await self.db.fetchone("SELECT * FROM admins WHERE user_id = ?", (user_id,))
+        return admin_row(admin) if admin else None
+
+    async def add_admin(self, user_id, username):
+        await self.db.execute(
+            'INSERT INTO admins (user_id, username) VALUES (?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET username = excluded.username',
+            (user_id, username)
+        )
+
+    async def delete_admin(self, user_id):
+        await self.db.execute("DELETE FROM admins WHERE user_id = ?", (user_id,))
+
+    async def get_setting(self, key):
+        row = await self.db.fetchone("SELECT value FROM bot_settings WHERE key = ?", (key,))
+        return row[0] if row else None
+
+    async def set_setting(self, key, value):
+        await self.db.execute(
+            "INSERT INTO bot_settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    async def upsert_user_stats(self, rows):
+        await self.db.executemany(self.USER_STATS_UPSERT, rows)
+
+    async def get_recent_users(self, limit):
+        users = await self.db.fetchall("SELECT * FROM user_stats ORDER BY last_seen DESC LIMIT ?", (limit,))
+        return [user_row(u) for u in users]
+
+    async def count_users(self):
+        result = await self.db.fetchone("SELECT value FROM stats_counters WHERE name = 'total_users'")
+        return result[0] if result else 0
+
+    def iter_user_ids(self, page_size=1000):
+        return self.db.iter_keys('user_stats', 'user_id', page_size=page_size)
+
+    async def stats_counters(self):
+        return await self.db.run(stats_counters.read)
+
+    def _read_versions(self):
+        # A private connection: data_version only moves for commits made by
+        # *other* connections, and this one never writes
+        if self._versions_conn is None:
+            self._versions_conn = sqlite3.connect(self.db.path, check_same_thread=False, timeout=30)
+        data_version = self._versions_conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return None
+        self._data_version = data_version
+        return dict(self._versions_conn.execute("SELECT domain, version FROM content_versions"))
+
+    async def content_versions(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self._read_versions)
+
+
+def open_repository(backend, db, dsn=''):
+    """Repository for the configured backend: 'sqlite' (on db) or 'postgres' (on dsn)"""
+    if backend == 'sqlite':
+        return SQLiteRepository(db)
+    if backend == 'postgres':
+        # asyncpg is only needed for this backend
+        from storage_postgres import PostgresRepository
+        return PostgresRepository(dsn)
+    raise ValueError(f"unknown storage backend: {backend}")
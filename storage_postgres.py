@@ -0,0 +1,446 @@
+"""PostgreSQL repository (STORAGE_BACKEND=postgres).
+
+Lets several bot processes on different hosts share one database. Queries
+go through an asyncpg connection pool; the schema is versioned by the
+numbered migrations below, tracked in schema_version. Timestamps are
+handed in and out as 'YYYY-MM-DD HH:MM:SS' strings, like the SQLite
+backend stores them.
+
+FAQ search uses a tsvector column built from the same normalised text as
+the SQLite FTS index (faq_search.normalize), question weighted above answer.
+The statistics screen reads stats_counters, kept current by row triggers
+like its SQLite counterpart (stats_counters.py).
+"""
+import json
+import logging
+
+import faq_search
+import migrations
+from storage import Repository, router_file_row, faq_row, package_row, admin_row, user_row
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+
+logger = logging.getLogger(__name__)
+
+TS = "to_char({}, 'YYYY-MM-DD HH24:MI:SS')"
+
+
+def p001_core_tables():
+    return ['''
+        CREATE TABLE admins (
+            user_id BIGINT PRIMARY KEY,
+            username TEXT,
+            added_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE bot_texts (
+            id SERIAL PRIMARY KEY,
+            type TEXT UNIQUE NOT NULL,
+            content TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE bot_images (
+            id SERIAL PRIMARY KEY,
+            type TEXT UNIQUE NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE router_files (
+            id SERIAL PRIMARY KEY,
+            type TEXT NOT NULL,
+            router_name TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            description TEXT,
+            file_name TEXT,
+            created_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE faq (
+            id SERIAL PRIMARY KEY,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            search TSVECTOR,
+            created_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE packages (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            price TEXT,
+            speed TEXT,
+            features TEXT,
+            created_at TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE user_stats (
+            user_id BIGINT PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            usage_count INTEGER DEFAULT 1,
+            first_seen TIMESTAMP DEFAULT now(),
+            last_seen TIMESTAMP DEFAULT now()
+        )
+    ''', '''
+        CREATE TABLE bot_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''',
+        "CREATE INDEX idx_faq_search ON faq USING GIN (search)",
+        "CREATE INDEX idx_router_files_type ON router_files (type)",
+        "CREATE INDEX idx_user_stats_last_seen ON user_stats (last_seen)",
+    ]
+
+
+def p002_change_feed():
+    """content_versions, bumped once per writing statement on every content table"""
+    return ['''
+        CREATE TABLE content_versions (
+            domain TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    ''', '''
+        CREATE FUNCTION bump_content_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE content_versions SET version = version + 1 WHERE domain = TG_ARGV[0];
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''',
+        "INSERT INTO content_versions (domain) VALUES "
+        "('admins'), ('texts'), ('images'), ('faq'), ('packages'), ('router_files'), ('maintenance')",
+        "CREATE TRIGGER admins_version AFTER INSERT OR UPDATE OR DELETE ON admins "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('admins')",
+        "CREATE TRIGGER bot_texts_version AFTER INSERT OR UPDATE OR DELETE ON bot_texts "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('texts')",
+        "CREATE TRIGGER bot_images_version AFTER INSERT OR UPDATE OR DELETE ON bot_images "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('images')",
+        "CREATE TRIGGER faq_version AFTER INSERT OR UPDATE OR DELETE ON faq "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('faq')",
+        "CREATE TRIGGER packages_version AFTER INSERT OR UPDATE OR DELETE ON packages "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('packages')",
+        "CREATE TRIGGER router_files_version AFTER INSERT OR UPDATE OR DELETE ON router_files "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('router_files')",
+        "CREATE TRIGGER bot_settings_version AFTER INSERT OR UPDATE OR DELETE ON bot_settings "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('maintenance')",
+    ]
+
+
+def p003_router_file_hashes():
+    return [
+        "ALTER TABLE router_files ADD COLUMN sha256 TEXT",
+        "CREATE UNIQUE INDEX idx_router_files_sha256 ON router_files (sha256)",
+    ]
+
+
+def p004_stats_counters():
+    """stats_counters maintained by row triggers, then counted once from the existing rows"""
+    return ['''
+        CREATE TABLE stats_counters (
+            name TEXT PRIMARY KEY,
+            value BIGINT NOT NULL DEFAULT 0
+        )
+    ''', '''
+        CREATE FUNCTION bump_stats_counter(counter TEXT, delta BIGINT) RETURNS void AS $$
+            INSERT INTO stats_counters (name, value) VALUES (counter, delta)
+            ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + excluded.value
+        $$ LANGUAGE sql
+    ''', '''
+        CREATE FUNCTION count_rows() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_stats_counter(TG_ARGV[0], CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''', '''
+        CREATE FUNCTION count_router_files() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                PERFORM bump_stats_counter('files_' || OLD.type, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM bump_stats_counter('files_' || NEW.type, 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''', '''
+        CREATE FUNCTION count_user_stats() RETURNS trigger AS $$
+        BEGIN
+            -- total_usage is always locked before total_users, so concurrent
+            -- upsert batches of several processes can't deadlock on them
+            IF TG_OP = 'INSERT' THEN
+                PERFORM bump_stats_counter('total_usage', NEW.usage_count);
+                PERFORM bump_stats_counter('total_users', 1);
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM bump_stats_counter('total_usage', NEW.usage_count - OLD.usage_count);
+            ELSE
+                PERFORM bump_stats_counter('total_usage', -OLD.usage_count);
+                PERFORM bump_stats_counter('total_users', -1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''',
+        "CREATE TRIGGER faq_counters AFTER INSERT OR DELETE ON faq "
+        "FOR EACH ROW EXECUTE FUNCTION count_rows('total_faq')",
+        "CREATE TRIGGER packages_counters AFTER INSERT OR DELETE ON packages "
+        "FOR EACH ROW EXECUTE FUNCTION count_rows('total_packages')",
+        "CREATE TRIGGER admins_counters AFTER INSERT OR DELETE ON admins "
+        "FOR EACH ROW EXECUTE FUNCTION count_rows('total_admins')",
+        "CREATE TRIGGER bot_images_counters AFTER INSERT OR DELETE ON bot_images "
+        "FOR EACH ROW EXECUTE FUNCTION count_rows('total_images')",
+        "CREATE TRIGGER bot_texts_counters AFTER INSERT OR DELETE ON bot_texts "
+        "FOR EACH ROW EXECUTE FUNCTION count_rows('total_texts')",
+        "CREATE TRIGGER router_files_counters AFTER INSERT OR DELETE OR UPDATE OF type ON router_files "
+        "FOR EACH ROW EXECUTE FUNCTION count_router_files()",
+        "CREATE TRIGGER user_stats_counters AFTER INSERT OR DELETE OR UPDATE OF usage_count ON user_stats "
+        "FOR EACH ROW EXECUTE FUNCTION count_user_stats()",
+    '''
+        INSERT INTO stats_counters (name, value)
+                  SELECT 'total_faq', COUNT(*) FROM faq
+        UNION ALL SELECT 'total_packages', COUNT(*) FROM packages
+        UNION ALL SELECT 'total_admins', COUNT(*) FROM admins
+        UNION ALL SELECT 'total_images', COUNT(*) FROM bot_images
+        UNION ALL SELECT 'total_texts', COUNT(*) FROM bot_texts
+        UNION ALL SELECT 'total_users', COUNT(*) FROM user_stats
+        UNION ALL SELECT 'total_usage', COALESCE(SUM(usage_count), 0) FROM user_stats
+        UNION ALL SELECT 'files_' || type, COUNT(*) FROM router_files GROUP BY type
+    ''']
+
+
+MIGRATIONS = [
+    p001_core_tables,
+    p002_change_feed,
+    p003_router_file_hashes,
+    p004_stats_counters,
+]
+
+
+class PostgresRepository(Repository):
+    USER_STATS_UPSERT = '''
+        INSERT INTO user_stats
+        (user_id, username, first_name, last_name, usage_count, first_seen, last_seen)
+        VALUES ($1, $2, $3, $4, $5, $6::text::timestamp, $7::text::timestamp)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = excluded.username,
+            first_name = excluded.first_name,
+            last_name = excluded.last_name,
+            usage_count = user_stats.usage_count + excluded.usage_count,
+            last_seen = excluded.last_seen
+    '''
+
+    def __init__(self, dsn, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def start(self):
+        import asyncpg
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        await self.migrate()
+
+    async def migrate(self):
+        """Apply pending migrations and seed the defaults, all in one transaction"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Serialise concurrent starts of several bot processes
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('schema_version'))")
+                await conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+                version = await conn.fetchval("SELECT MAX(version) FROM schema_version") or 0
+                for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+                    for statement in migration():
+                        await conn.execute(statement)
+                    await conn.execute("INSERT INTO schema_version (version) VALUES ($1)", number)
+                    logger.info("Applied postgres migration %d: %s", number, migration.__name__)
+                await conn.executemany(
+                    "INSERT INTO bot_texts (type, content) VALUES ($1, $2) ON CONFLICT (type) DO NOTHING",
+                    migrations.DEFAULT_TEXTS
+                )
+                await conn.execute(
+                    "INSERT INTO admins (user_id, username) SELECT $1, $2 WHERE NOT EXISTS (SELECT 1 FROM admins)",
+                    *migrations.DEFAULT_ADMIN
+                )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def get_texts(self):
+        return dict(await self.pool.fetch("SELECT type, content FROM bot_texts"))
+
+    async def save_text(self, text_type, content):
+        await self.pool.execute(
+            'INSERT INTO bot_texts (type, content) VALUES ($1, $2) '
+            'ON CONFLICT (type) DO UPDATE SET content = excluded.content, updated_at = now()',
+            text_type, content
+        )
+
+    async def get_images(self):
+        return dict(await self.pool.fetch("SELECT type, file_id FROM bot_images"))
+
+    async def save_image(self, image_type, file_id):
+        await self.pool.execute(
+            'INSERT INTO bot_images (type, file_id) VALUES ($1, $2) '
+            'ON CONFLICT (type) DO UPDATE SET file_id = excluded.file_id',
+            image_type, file_id
+        )
+
+    async def delete_image(self, image_type):
+        await self.pool.execute("DELETE FROM bot_images WHERE type = $1", image_type)
+
+    ROUTER_FILE_COLUMNS = "id, type, router_name, file_id, description, file_name"
+
+    async def get_router_files(self, router_type):
+        files = await self.pool.fetch(f"SELECT {self.ROUTER_FILE_COLUMNS} FROM router_files WHERE type = $1 ORDER BY id", router_type)
+        return [router_file_row(f) for f in files]
+
+    async def get_all_router_files(self):
+        files = await self.pool.fetch(f"SELECT {self.ROUTER_FILE_COLUMNS} FROM router_files ORDER BY id")
+        return [router_file_row(f) for f in files]
+
+    async def get_router_file(self, file_id):
+        file = await self.pool.fetchrow(f"SELECT {self.ROUTER_FILE_COLUMNS} FROM router_files WHERE id = $1", file_id)
+        return router_file_row(file) if file else None
+
+    async def add_router_file(self, file_type, router_name, file_id, description, file_name):
+        return await self.pool.fetchval(
+            'INSERT INTO router_files (type, router_name, file_id, description, file_name) '
+            'VALUES ($1, $2, $3, $4, $5) RETURNING id',
+            file_type, router_name, file_id, description, file_name
+        )
+
+    async def delete_router_file(self, file_id):
+        await self.pool.execute("DELETE FROM router_files WHERE id = $1", file_id)
+
+    async def get_router_file_hashes(self):
+        return {row[0] for row in await self.pool.fetch("SELECT sha256 FROM router_files WHERE sha256 IS NOT NULL")}
+
+    async def add_router_files(self, files):
+        if not files:
+            return 0
+        # One statement over column arrays: a single round trip and transaction
+        status = await self.pool.execute('''
+            INSERT INTO router_files (type, router_name, file_id, description, file_name, sha256)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[])
+            ON CONFLICT (sha256) DO NOTHING
+        ''', *[list(column) for column in zip(*files)])
+        return int(status.rsplit(' ', 1)[1])
+
+    async def get_faqs(self):
+        return [faq_row(f) for f in await self.pool.fetch("SELECT id, question, answer FROM faq ORDER BY id")]
+
+    async def get_faq(self, faq_id):
+        faq = await self.pool.fetchrow("SELECT id, question, answer FROM faq WHERE id = $1", faq_id)
+        return faq_row(faq) if faq else None
+
+    async def add_faq(self, question, answer):
+        return await self.pool.fetchval(
+            "INSERT INTO faq (question, answer, search) VALUES ($1, $2, "
+            "setweight(to_tsvector('simple', $3), 'A') || setweight(to_tsvector('simple', $4), 'B')) RETURNING id",
+            question, answer, faq_search.normalize(question), faq_search.normalize(answer)
+        )
+
+    async def delete_faq(self, faq_id):
+        await self.pool.execute("DELETE FROM faq WHERE id = $1", faq_id)
+
+    async def search_faq(self, text, limit=3):
+        """ts_rank-ordered FAQ matches for free text (prefix match on every term)"""
+        terms = faq_search.search_terms(text)
+        if not terms:
+            return []
+        query = ' | '.join(f"'{term}':*" for term in terms)
+        rows = await self.pool.fetch('''
+            SELECT id, question, answer FROM faq, to_tsquery('simple', $1) AS query
+            WHERE search @@ query
+            ORDER BY ts_rank(search, query) DESC, id
+            LIMIT $2
+        ''', query, limit)
+        return [faq_row(r) for r in rows]
+
+    async def get_packages(self):
+        packages = await self.pool.fetch("SELECT id, name, price, speed, features FROM packages ORDER BY id")
+        return [package_row(p) for p in packages]
+
+    async def get_package(self, package_id):
+        package = await self.pool.fetchrow("SELECT id, name, price, speed, features FROM packages WHERE id = $1", package_id)
+        return package_row(package) if package else None
+
+    async def add_package(self, name, price, speed, features):
+        return await self.pool.fetchval(
+            'INSERT INTO packages (name, price, speed, features) VALUES ($1, $2, $3, $4) RETURNING id',
+            name, price, speed, json.dumps(features)
+        )
+
+    async def delete_package(self, package_id):
+        await self.pool.execute("DELETE FROM packages WHERE id = $1", package_id)
+
+    async def get_admins(self):
+        return [admin_row(a) for a in await self.pool.fetch("SELECT user_id, username FROM admins")]
+
+    async def get_admin(self, user_id):
+        admin = await self.pool.fetchrow("SELECT user_id, username FROM admins WHERE user_id = $1", user_id)
+        return admin_row(admin) if admin else None
+
+    async def add_admin(self, user_id, username):
+        await self.pool.execute(
+            'INSERT INTO admins (user_id, username) VALUES ($1, $2) '
+            'ON CONFLICT (user_id) DO UPDATE SET username = excluded.username',
+            user_id, username
+        )
+
+    async def delete_admin(self, user_id):
+        await self.pool.execute("DELETE FROM admins WHERE user_id = $1", user_id)
+
+    async def get_setting(self, key):
+        return await self.pool.fetchval("SELECT value FROM bot_settings WHERE key = $1", key)
+
+    async def set_setting(self, key, value):
+        await self.pool.execute(
+            "INSERT INTO bot_settings (key, value) VALUES ($1, $2) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            key, value
+        )
+
+    async def upsert_user_stats(self, rows):
+        await self.pool.executemany(self.USER_STATS_UPSERT, rows)
+
+    async def get_recent_users(self, limit):
+        users = await self.pool.fetch(f'''
+            SELECT user_id, username, first_name, last_name, usage_count,
+                   {TS.format('first_seen')}, {TS.format('last_seen')}
+            FROM user_stats ORDER BY last_seen DESC LIMIT $1
+        ''', limit)
+        return [user_row(u) for u in users]
+
+    async def count_users(self):
+        return await self.pool.fetchval("SELECT value FROM stats_counters WHERE name = 'total_users'") or 0
+
+    async def iter_user_ids(self, page_size=1000):
+        last_id = None
+        while True:
+            if last_id is None:
+                rows = await self.pool.fetch("SELECT user_id FROM user_stats ORDER BY user_id LIMIT $1", page_size)
+            else:
+                rows = await self.pool.fetch(
+                    "SELECT user_id FROM user_stats WHERE user_id > $1 ORDER BY user_id LIMIT $2", last_id, page_size
+                )
+            for row in rows:
+                yield row[0]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    async def stats_counters(self):
+        return dict(await self.pool.fetch("SELECT name, value FROM stats_counters"))
+
+    async def content_versions(self):
+        # No cheap "anything committed?" probe as in SQLite; the table is tiny
+        return dict(await self.pool.fetch("SELECT domain, version FROM content_versions"))
@@ -0,0 +1,251 @@
+"""Behaviour tests run against every storage backend.
+
+    python -m pytest -q test_storage.py
+
+SQLite runs on a temporary database file. PostgreSQL runs when
+DATABASE_URL is set: each test creates (and drops) its own database on that
+server, so the role needs CREATEDB; nothing in DATABASE_URL's database is
+touched. Tests without DATABASE_URL skip the postgres backend.
+"""
+import asyncio
+import os
+import uuid
+from urllib.parse import urlsplit
+
+import pytest
+
+import migrations
+from database import Database
+from storage import SQLiteRepository
+
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+
+
+def run_sqlite(tmp_path, test):
+    db = Database(str(tmp_path / 'bot.db'))
+    with db.connection() as conn:
+        migrations.migrate(conn)
+
+    async def main():
+        repo = SQLiteRepository(db)
+        await repo.start()
+        try:
+            await test(repo)
+        finally:
+            await repo.close()
+    try:
+        asyncio.run(main())
+    finally:
+        db.close()
+
+
+def run_postgres(tmp_path, test):
+    import asyncpg
+    from storage_postgres import PostgresRepository
+
+    name = f"bot_test_{uuid.uuid4().hex[:12]}"
+    dsn = urlsplit(DATABASE_URL)._replace(path='/' + name).geturl()
+
+    async def main():
+        admin = await asyncpg.connect(DATABASE_URL)
+        await admin.execute(f'CREATE DATABASE "{name}"')
+        try:
+            repo = PostgresRepository(dsn)
+            await repo.start()
+            try:
+                await test(repo)
+            finally:
+                await repo.close()
+        finally:
+            await admin.execute(f'DROP DATABASE "{name}"')
+            await admin.close()
+    asyncio.run(main())
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def run(request, tmp_path):
+    """run(test) calls `async def test(repo)` on a fresh, migrated repository"""
+    if request.param == 'postgres' and not DATABASE_URL:
+        pytest.skip("DATABASE_URL is not set")
+    runner = run_sqlite if request.param == 'sqlite' else run_postgres
+    return lambda test: runner(tmp_path, test)
+
+
+def user(user_id, uses=1, seen='2026-01-01 10:00:00', username='u'):
+    return (user_id, username, 'First', None, uses, seen, seen)
+
+
+def test_defaults_are_seeded(run):
+    async def test(repo):
+        texts = await repo.get_texts()
+        assert set(texts) == {t for t, _ in migrations.DEFAULT_TEXTS}
+        assert [a['user_id'] for a in await repo.get_admins()] == [migrations.DEFAULT_ADMIN[0]]
+    run(test)
+
+
+def test_texts_and_images(run):
+    async def test(repo):
+        await repo.save_text('contact', 'first')
+        await repo.save_text('contact', 'second')
+        await repo.save_text('custom', 'new')
+        texts = await repo.get_texts()
+        assert texts['contact'] == 'second' and texts['custom'] == 'new'
+
+        await repo.save_image('faq', 'file-1')
+        await repo.save_image('faq', 'file-2')
+        await repo.save_image('welcome', 'file-3')
+        assert await repo.get_images() == {'faq': 'file-2', 'welcome': 'file-3'}
+        await repo.delete_image('faq')
+        assert await repo.get_images() == {'welcome': 'file-3'}
+    run(test)
+
+
+def test_router_files(run):
+    async def test(repo):
+        adsl = await repo.add_router_file('adsl', 'TP-Link', 'fid-1', 'desc', 'tp.bin')
+        await repo.add_router_file('ftth', 'Huawei', 'fid-2', None, None)
+        assert [f['router_name'] for f in await repo.get_router_files('adsl')] == ['TP-Link']
+        assert len(await repo.get_all_router_files()) == 2
+        assert await repo.get_router_file(adsl) == {
+            'id': adsl, 'type': 'adsl', 'router_name': 'TP-Link', 'file_id': 'fid-1',
+            'description': 'desc', 'file_name': 'tp.bin'
+        }
+        await repo.delete_router_file(adsl)
+        assert await repo.get_router_file(adsl) is None
+        assert await repo.get_router_files('adsl') == []
+    run(test)
+
+
+def test_router_files_sha256_dedupe(run):
+    async def test(repo):
+        # Files added through the chat flow have no hash and never conflict
+        await repo.add_router_file('adsl', 'Manual', 'fid-0', None, None)
+        batch = [
+            ('adsl', 'A', 'fid-a', '', 'a.bin', 'hash-a'),
+            ('ftth', 'B', 'fid-b', 'd', 'b.bin', 'hash-b'),
+        ]
+        assert await repo.add_router_files(batch) == 2
+        assert await repo.add_router_files(batch + [('adsl', 'C', 'fid-c', '', 'c.bin', 'hash-c')]) == 1
+        assert await repo.add_router_files([]) == 0
+        assert await repo.get_router_file_hashes() == {'hash-a', 'hash-b', 'hash-c'}
+        assert sorted(f['router_name'] for f in await repo.get_all_router_files()) == ['A', 'B', 'C', 'Manual']
+    run(test)
+
+
+def test_faq_add_delete_search(run):
+    async def test(repo):
+        restart = await repo.add_faq('كيف أعيد تشغيل الراوتر؟', 'افصل الكهرباء لمدة 30 ثانية.')
+        dns = await repo.add_faq('ما هو عنوان الـ DNS؟', 'استخدم 8.8.8.8')
+        assert [f['id'] for f in await repo.get_faqs()] == [restart, dns]
+        assert (await repo.get_faq(dns))['answer'] == 'استخدم 8.8.8.8'
+
+        assert [f['id'] for f in await repo.search_faq('الراوتر')] == [restart]
+        assert [f['id'] for f in await repo.search_faq('كهرب')] == [restart]  # prefix of an answer word
+        assert (await repo.search_faq('dns'))[0]['id'] == dns
+        assert await repo.search_faq('كيف') == []  # stop word only
+        assert await repo.search_faq('') == []
+
+        await repo.delete_faq(restart)
+        assert await repo.get_faq(restart) is None
+        assert await repo.search_faq('الراوتر') == []
+    run(test)
+
+
+def test_packages(run):
+    async def test(repo):
+        basic = await repo.add_package('Basic', '100', '10M', ['24/7', 'router'])
+        await repo.add_package('Empty', '0', '1M', [])
+        assert await repo.get_package(basic) == {
+            'id': basic, 'name': 'Basic', 'price': '100', 'speed': '10M', 'features': ['24/7', 'router']
+        }
+        assert [p['name'] for p in await repo.get_packages()] == ['Basic', 'Empty']
+        await repo.delete_package(basic)
+        assert await repo.get_package(basic) is None
+        assert [p['name'] for p in await repo.get_packages()] == ['Empty']
+    run(test)
+
+
+def test_admins(run):
+    async def test(repo):
+        await repo.add_admin(42, 'first')
+        await repo.add_admin(42, 'renamed')
+        assert await repo.get_admin(42) == {'user_id': 42, 'username': 'renamed'}
+        assert len(await repo.get_admins()) == 2
+        await repo.delete_admin(42)
+        assert await repo.get_admin(42) is None
+    run(test)
+
+
+def test_settings(run):
+    async def test(repo):
+        assert await repo.get_setting('maintenance') is None
+        await repo.set_setting('maintenance', '1')
+        await repo.set_setting('maintenance', '0')
+        assert await repo.get_setting('maintenance') == '0'
+    run(test)
+
+
+def test_upsert_user_stats(run):
+    async def test(repo):
+        await repo.upsert_user_stats([user(1, uses=3, seen='2026-01-01 10:00:00', username='old')])
+        await repo.upsert_user_stats([
+            user(1, uses=2, seen='2026-01-02 10:00:00', username='new'),
+            user(2, uses=1, seen='2026-01-03 10:00:00'),
+        ])
+        first, second = sorted(await repo.get_recent_users(10), key=lambda u: u['user_id'])
+        assert first['usage_count'] == 5
+        assert first['username'] == 'new'
+        assert first['first_seen'] == '2026-01-01 10:00:00'  # kept from the first upsert
+        assert first['last_seen'] == '2026-01-02 10:00:00'
+        assert second['usage_count'] == 1
+        assert [u['user_id'] for u in await repo.get_recent_users(1)] == [2]
+        assert await repo.count_users() == 2
+    run(test)
+
+
+def test_iter_user_ids(run):
+    async def test(repo):
+        ids = [7, 3, 12, 1, 9]
+        await repo.upsert_user_stats([user(user_id) for user_id in ids])
+        assert [u async for u in repo.iter_user_ids(page_size=2)] == sorted(ids)
+        assert [u async for u in repo.iter_user_ids(page_size=5)] == sorted(ids)
+    run(test)
+
+
+def test_content_versions(run):
+    async def test(repo):
+        before = await repo.content_versions()
+        assert set(before) >= {'admins', 'texts', 'images', 'faq', 'packages', 'router_files', 'maintenance'}
+
+        await repo.add_package('Basic', '100', '10M', [])
+        await repo.set_setting('maintenance', '1')
+        after = await repo.content_versions()
+        assert after['packages'] > before['packages']
+        assert after['maintenance'] > before['maintenance']
+        assert after['faq'] == before['faq']
+    run(test)
+
+
+def test_stats_counters(run):
+    async def test(repo):
+        await repo.add_router_file('adsl', 'A', 'fid-a', None, None)
+        ftth = await repo.add_router_file('ftth', 'B', 'fid-b', None, None)
+        await repo.add_faq('سؤال', 'جواب')
+        await repo.add_package('Basic', '100', '10M', [])
+        await repo.add_admin(42, 'second')
+        await repo.save_image('faq', 'file-1')
+        await repo.upsert_user_stats([user(1, uses=3), user(2, uses=4)])
+        await repo.upsert_user_stats([user(1, uses=5)])
+        await repo.delete_router_file(ftth)
+
+        counters = await repo.stats_counters()
+        assert counters['total_users'] == 2
+        assert counters['total_usage'] == 12
+        assert counters['files_adsl'] == 1
+        assert counters.get('files_ftth', 0) == 0
+        assert counters['total_faq'] == 1
+        assert counters['total_packages'] == 1
+        assert counters['total_admins'] == 2
+        assert counters['total_images'] == 1
+        assert counters['total_texts'] == len(migrations.DEFAULT_TEXTS)
+    run(test)
@@ -0,0 +1,60 @@
+"""Per-user flood protection.
+
+Every (user, action) pair gets a small token bucket kept in memory. Buckets
+live in an LRU-ordered dict capped at max_entries; a bucket idle long
+enough to have refilled completely is indistinguishable from a new one, so
+it is dropped by the periodic sweep.
+"""
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 50000
+# A throttled user is told to slow down at most once per window and action
+WARN_WINDOW = 10.0
+SWEEP_INTERVAL = 60.0
+
+
+class UserThrottle:
+    def __init__(self, limits, default, max_entries=MAX_ENTRIES, warn_window=WARN_WINDOW):
+        """limits maps an action name to (rate per second, burst); default covers the rest"""
+        self.limits = limits
+        self.default = default
+        self.max_entries = max_entries
+        self.warn_window = warn_window
+        self._buckets = OrderedDict()  # (user_id, action) -> [tokens, updated, warned_until]
+        self._last_sweep = time.monotonic()
+
+    def hit(self, user_id, action):
+        """Take one token for this user and action.
+        Returns (allowed, warn): warn is True on the first rejection of a window."""
+        rate, burst = self.limits.get(action, self.default)
+        now = time.monotonic()
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep()
+        key = (user_id, action)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now, 0.0]
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, False
+        if now >= bucket[2]:
+            bucket[2] = now + self.warn_window
+            return False, True
+        return False, False
+
+    def sweep(self):
+        """Drop buckets that have been idle long enough to be full again"""
+        now = self._last_sweep = time.monotonic()
+        for key, (tokens, updated, warned_until) in list(self._buckets.items()):
+            rate, burst = self.limits.get(key[1], self.default)
+            if tokens + (now - updated) * rate >= burst and now >= warned_until:
+                del self._buckets[key]
+        return len(self._buckets)
@@ -0,0 +1,150 @@
+"""Embedded webhook server.
+
+A small asyncio HTTP/1.1 server that accepts Telegram's webhook POSTs,
+checks the secret token and hands the decoded updates to put_update (the
+running Application's update_queue.put, or the shard router in sharded
+mode). The secret is mandatory: without it anyone who can reach the port
+could post updates in an admin's name.
+
+When the server is given PendingAnswers, a callback query's HTTP response
+is held for up to ANSWER_TIMEOUT seconds so the handler's answer (text and
+show_alert included) can go back as the webhook reply
+(answerCallbackQuery), saving the separate API round trip. Answers that
+come later are sent through the API as usual.
+
+Local test, with BOT_MODE=webhook and no WEBHOOK_URL set:
+    curl -X POST -H "Content-Type: application/json" \
+         -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \
+         --data @update.json http://127.0.0.1:8443/webhook
+"""
+import asyncio
+import hmac
+import json
+import logging
+from telegram import Update # type: ignore
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+# Seconds a callback query's response waits for the handler's answer
+ANSWER_TIMEOUT = 1.0
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+class PendingAnswers:
+    """Callback queries whose webhook response is waiting for the handler's answer"""
+
+    def __init__(self):
+        self._waiting = {}  # callback query id -> future of the answerCallbackQuery parameters
+
+    def expect(self, query_id):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[query_id] = future
+        return future
+
+    def answer(self, query_id, **params):
+        """Hand the answer to the waiting response; False when nothing waits (any more)"""
+        future = self._waiting.pop(query_id, None)
+        if future is None or future.done():
+            return False
+        future.set_result({name: value for name, value in params.items() if value is not None})
+        return True
+
+    async def wait(self, query_id, future, timeout=ANSWER_TIMEOUT):
+        """The handler's answer parameters, or None if it didn't answer in time"""
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if self._waiting.get(query_id) is future:
+                del self._waiting[query_id]
+            return None
+
+
+class WebhookServer:
+    def __init__(self, bot, put_update, secret_token, path='/webhook', answers=None):
+        if not secret_token:
+            raise ValueError("webhook mode requires a secret token")
+        self.bot = bot
+        self.put_update = put_update
+        self.secret_token = secret_token
+        self.path = path
+        self.answers = answers  # PendingAnswers, or None to leave every answer to the API
+        self._server = None
+
+    async def start(self, host, port):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        logger.info("Webhook server listening on %s:%s%s", host, port, self.path)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            # Telegram keeps connections alive, so serve requests until EOF
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self._dispatch(method, path, headers, body)
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, headers, body):
+        if path.split('?', 1)[0] != self.path:
+            return 404, None
+        if method != 'POST':
+            return 405, None
+        if not hmac.compare_digest(headers.get('x-telegram-bot-api-secret-token', ''), self.secret_token):
+            return 403, None
+        try:
+            update = Update.de_json(json.loads(body), self.bot)
+        except Exception:
+            logger.warning("Rejected malformed webhook update")
+            return 400, None
+
+        if not (self.answers and update.callback_query):
+            await self.put_update(update)
+            return 200, None
+
+        query_id = update.callback_query.id
+        future = self.answers.expect(query_id)
+        await self.put_update(update)
+        params = await self.answers.wait(query_id, future)
+        if params is None:
+            return 200, None
+        return 200, {'method': 'answerCallbackQuery', 'callback_query_id': query_id, **params}
+
+    async def _respond(self, writer, status, payload=None):
+        body = json.dumps(payload).encode() if payload else b''
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()